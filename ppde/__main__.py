@@ -1,5 +1,7 @@
-"""Entry point for python -m ppde.cli"""
+"""Entry point for python -m ppde"""
+import sys
+
 from ppde.cli import main
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -7,25 +7,61 @@ Thin wrapper over the analysis engine.
 
 from __future__ import annotations
 
-import argparse
 import sys
-from pathlib import Path
+from typing import TYPE_CHECKING
 
-from ppde.orchestrator import analyze_repo
+if TYPE_CHECKING:
+    import argparse
 
 
-def build_parser() -> argparse.ArgumentParser:
-    parser = argparse.ArgumentParser(
-        prog="ppde",
-        description="Analyze Python code for deviations from your historical patterns.",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
+_EPILOG = """\
 Examples:
   ppde analyze .
   ppde analyze /path/to/repo
-        """,
+"""
+
+# Preformatted output of build_parser() for the paths that never need a parser.
+# tests/test_cli.py asserts these stay in sync with argparse.
+_USAGE = "usage: ppde [-h] {analyze} ...\n"
+
+_HELP = _USAGE + """
+Analyze Python code for deviations from your historical patterns.
+
+positional arguments:
+  {analyze}
+    analyze   Analyze a Git repository
+
+options:
+  -h, --help  show this help message and exit
+
+""" + _EPILOG
+
+_MISSING_COMMAND = "ppde: error: the following arguments are required: {analyze}\n"
+
+_COLD_START = """\
+No warnings (COLD START MODE).
+
+The frequency table is empty - all patterns are blocked by sparsity gate.
+This is conservative: the system refuses to guess when data is missing.
+
+See README for implementation details.
+"""
+
+_RULE = "-" * 70
+
+
+def build_root_parser() -> argparse.ArgumentParser:
+    import argparse
+
+    return argparse.ArgumentParser(
+        prog="ppde",
+        description="Analyze Python code for deviations from your historical patterns.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=_EPILOG,
     )
 
+
+def add_analyze_subparser(parser: argparse.ArgumentParser) -> None:
     subparsers = parser.add_subparsers(
         dest="command",
         required=True,
@@ -43,55 +79,82 @@ Examples:
         help="Path to Git repository (default: current directory)",
     )
 
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = build_root_parser()
+    add_analyze_subparser(parser)
     return parser
 
 
+def _run_analyze(path: str) -> int:
+    from pathlib import Path
+
+    repo_path = Path(path).resolve()
+
+    if not repo_path.exists():
+        print(f"Error: Path does not exist: {repo_path}", file=sys.stderr)
+        return 1
+
+    # Deferred: the engine pulls in every layer, which --help and
+    # argument errors never need.
+    from ppde.orchestrator import analyze_repo
+
+    try:
+        explanations = analyze_repo(repo_path)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except Exception:
+        print("Internal error while analyzing repository.", file=sys.stderr)
+        print("Run with --debug for details.", file=sys.stderr)
+        return 2
+
+    # Whole report in one write; a print per line costs a locked write each
+    header = f"Analyzed repository: {repo_path}\nTotal findings: {len(explanations)}\n\n"
+
+    if not explanations:
+        sys.stdout.write(header + _COLD_START)
+        return 0
+
+    parts = [header]
+    for i, explanation in enumerate(explanations, 1):
+        detector_name = explanation.warning.score.detector_name
+        parts.append(
+            f"Finding #{i}\n"
+            f"Detector: {detector_name}\n\n"
+            f"{explanation.message}\n\n"
+            f"{_RULE}\n\n"
+        )
+    sys.stdout.write("".join(parts))
+
+    return 0
+
+
 def main(argv: list[str] | None = None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+
+    # Empty command line and top-level help never reach a subcommand,
+    # so answer them without building the parser tree.
+    if not argv:
+        sys.stderr.write(_USAGE + _MISSING_COMMAND)
+        return 2
+    if argv[0] in ("-h", "--help"):
+        sys.stdout.write(_HELP)
+        return 0
+
+    # "analyze [path]" with no options is the common case and needs no
+    # parser; options, extra arguments and typos go through argparse
+    # for its help and error messages.
+    rest = argv[1:]
+    if argv[0] == "analyze" and len(rest) <= 1 and not any(a.startswith("-") for a in rest):
+        return _run_analyze(rest[0] if rest else ".")
+
     parser = build_parser()
     args = parser.parse_args(argv)
 
     if args.command == "analyze":
-        repo_path = Path(args.path).resolve()
-
-        if not repo_path.exists():
-            print(f"Error: Path does not exist: {repo_path}", file=sys.stderr)
-            return 1
-
-        try:
-            explanations = analyze_repo(repo_path)
-        except ValueError as e:
-            print(f"Error: {e}", file=sys.stderr)
-            return 1
-        except Exception:
-            print("Internal error while analyzing repository.", file=sys.stderr)
-            print("Run with --debug for details.", file=sys.stderr)
-            return 2
-
-        print(f"Analyzed repository: {repo_path}")
-        print(f"Total findings: {len(explanations)}")
-        print()
-
-        if not explanations:
-            print("No warnings (COLD START MODE).")
-            print()
-            print("The frequency table is empty - all patterns are blocked by sparsity gate.")
-            print("This is conservative: the system refuses to guess when data is missing.")
-            print()
-            print("See README for implementation details.")
-            return 0
-
-        for i, explanation in enumerate(explanations, 1):
-            detector_name = explanation.warning.score.detector_name
-
-            print(f"Finding #{i}")
-            print(f"Detector: {detector_name}")
-            print()
-            print(explanation.message)
-            print()
-            print("-" * 70)
-            print()
-
-        return 0
+        return _run_analyze(args.path)
 
     # This should never happen because argparse enforces commands
     parser.error(f"Unknown command: {args.command}")
@@ -5,12 +5,13 @@ Maps (detector, code location, git history) → discrete PatternContext.
 Context is the GROUP BY key for frequency counting.
 """
 import ast
-from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
+from dataclasses import dataclass, field
+from datetime import datetime
 from enum import Enum
-from typing import Dict, List
+from itertools import product
+from typing import Dict, List, Tuple
 
-from .data_structures import Commit
+from .data_structures import Commit, epoch_seconds
 
 
 class Location(Enum):
@@ -46,7 +47,7 @@ OPERATION_BY_DETECTOR: Dict[str, Operation] = {
 }
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PatternContext:
     location:  Location
     operation: Operation
@@ -56,41 +57,58 @@ class PatternContext:
         return f"{self.location.value}:{self.operation.value}:{self.stability.value}"
 
 
+# Every possible context, built once; contexts compare and hash by value but
+# assign_context only ever hands out these canonical instances.
+_CONTEXTS: Dict[Tuple[Location, Operation, Stability], PatternContext] = {
+    (loc, op, stab): PatternContext(loc, op, stab)
+    for loc, op, stab in product(Location, Operation, Stability)
+}
+
+
+def intern_context(
+    location: Location, operation: Operation, stability: Stability,
+) -> PatternContext:
+    """The canonical PatternContext for (location, operation, stability)."""
+    return _CONTEXTS[(location, operation, stability)]
+
+
 # Constants for stability calculation
 _NEW_DAYS = 30
 _VOLATILE_DAYS = 90
 _FIX_THRESHOLD = 3
 
+_DAY_SECONDS = 86400
 
-def _file_first_seen(file_path: str, commits: List[Commit]) -> datetime | None:
-    """When did this file first appear in history?"""
-    earliest = None
-    for commit in commits:
-        if file_path in commit.files_changed:
-            if earliest is None or commit.timestamp < earliest:
-                earliest = commit.timestamp
-    return earliest
 
-
-def _last_modified(file_path: str, commits: List[Commit]) -> datetime | None:
-    """When was this file last touched?"""
-    latest = None
-    for commit in commits:
-        if file_path in commit.files_changed:
-            if latest is None or commit.timestamp > latest:
-                latest = commit.timestamp
-    return latest
+@dataclass
+class FileHistoryIndex:
+    """
+    Per-file aggregates of git history. Built once, queried per file.
+    
+    Times are epoch seconds (Commit.ts_epoch) so stability checks are
+    plain integer comparisons.
+    """
+    first_seen:     Dict[str, int] = field(default_factory=dict)
+    last_modified:  Dict[str, int] = field(default_factory=dict)
+    fix_timestamps: Dict[str, List[int]] = field(default_factory=dict)
 
 
-def _count_fix_commits(file_path: str, commits: List[Commit], cutoff: datetime) -> int:
-    """Count fix-related commits touching this file after cutoff."""
-    count = 0
+def build_file_history_index(commits: List[Commit]) -> FileHistoryIndex:
+    """Single pass over history: when each file was first seen, last touched, and fixed."""
+    index = FileHistoryIndex()
     for commit in commits:
-        if commit.timestamp >= cutoff:
-            if file_path in commit.files_changed:
-                if commit.has_fix_keyword():
-                    count += 1
-    return count
+        timestamp = commit.ts_epoch
+        is_fix = commit.is_fix
+        for file_path in commit.files_changed_set:
+            first = index.first_seen.get(file_path)
+            if first is None or timestamp < first:
+                index.first_seen[file_path] = timestamp
+            last = index.last_modified.get(file_path)
+            if last is None or timestamp > last:
+                index.last_modified[file_path] = timestamp
+            if is_fix:
+                index.fix_timestamps.setdefault(file_path, []).append(timestamp)
+    return index
 
 
 def _determine_location(
@@ -116,28 +134,31 @@ def _determine_operation(detector_name: str) -> Operation:
     return OPERATION_BY_DETECTOR.get(detector_name, Operation.COMPUTATION)
 
 
-def _determine_stability(file_path: str, commits: List[Commit], now: datetime) -> Stability:
+def _determine_stability(file_path: str, history: FileHistoryIndex, now: datetime) -> Stability:
     """
     File stability from git history.
     Precedence: NEW > VOLATILE > MODIFIED > STABLE
     """
-    first_seen = _file_first_seen(file_path, commits)
+    first_seen = history.first_seen.get(file_path)
     
     if first_seen is None:
         return Stability.NEW
     
+    now_epoch = epoch_seconds(now)
+    
     # Rule 1 - NEW
-    if (now - first_seen).total_seconds() / 86400.0 < _NEW_DAYS:
+    if first_seen > now_epoch - _NEW_DAYS * _DAY_SECONDS:
         return Stability.NEW
     
-    cutoff_90 = now - timedelta(days=_VOLATILE_DAYS)
+    cutoff_90 = now_epoch - _VOLATILE_DAYS * _DAY_SECONDS
     
     # Rule 2 - VOLATILE
-    if _count_fix_commits(file_path, commits, cutoff_90) >= _FIX_THRESHOLD:
+    fixes = history.fix_timestamps.get(file_path, ())
+    if sum(1 for ts in fixes if ts >= cutoff_90) >= _FIX_THRESHOLD:
         return Stability.VOLATILE
     
     # Rule 3 - MODIFIED
-    last_mod = _last_modified(file_path, commits)
+    last_mod = history.last_modified.get(file_path)
     if last_mod is not None and last_mod >= cutoff_90:
         return Stability.MODIFIED
     
@@ -152,13 +173,13 @@ def assign_context(
     function_node: ast.FunctionDef | None,
     class_node: ast.ClassDef | None,
     file_path: str,
-    commits: List[Commit],
+    history: FileHistoryIndex,
     now: datetime,
     parent_function_node: ast.FunctionDef | None = None,
 ) -> PatternContext:
     """Map (detector, code location, git history) to a PatternContext."""
-    return PatternContext(
-        location=_determine_location(function_node, class_node, parent_function_node),
-        operation=_determine_operation(detector_name),
-        stability=_determine_stability(file_path, commits, now),
+    return intern_context(
+        _determine_location(function_node, class_node, parent_function_node),
+        _determine_operation(detector_name),
+        _determine_stability(file_path, history, now),
     )
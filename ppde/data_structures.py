@@ -3,12 +3,27 @@ Data structures for Git history representation.
 
 All structures are immutable and deterministic.
 """
-from dataclasses import dataclass
-from datetime import datetime
-from typing import List
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import FrozenSet, List
 
+_FIX_KEYWORDS = frozenset({'fix', 'bug', 'error', 'crash', 'broken', 'issue'})
+_REFACTOR_KEYWORDS = frozenset({'refactor', 'cleanup', 'style', 'migration'})
 
-@dataclass(frozen=True)
+# One scan per message instead of one substring search per keyword
+_FIX_RE = re.compile("|".join(sorted(_FIX_KEYWORDS)), re.IGNORECASE)
+_REFACTOR_RE = re.compile("|".join(sorted(_REFACTOR_KEYWORDS)), re.IGNORECASE)
+
+
+def epoch_seconds(moment: datetime) -> int:
+    """Whole seconds since the Unix epoch. Naive datetimes are read as UTC."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+@dataclass(frozen=True, slots=True)
 class FileDiff:
     """Represents changes to a single file in a commit."""
     
@@ -33,6 +48,26 @@ class Commit:
     message: str
     file_diffs: List[FileDiff]
     
+    # Derived from message once at construction; history passes query these per file.
+    is_fix: bool = field(init=False, repr=False, compare=False)
+    _refactor: bool = field(init=False, repr=False, compare=False)
+    ts_epoch: int = field(init=False, repr=False, compare=False)
+    # Membership sets over file_diffs, for per-file lookups
+    files_changed_set: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    python_files_changed_set: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Frozen dataclass: populate derived fields via object.__setattr__
+        object.__setattr__(self, "is_fix", _FIX_RE.search(self.message) is not None)
+        object.__setattr__(self, "_refactor", _REFACTOR_RE.search(self.message) is not None)
+        object.__setattr__(self, "ts_epoch", epoch_seconds(self.timestamp))
+        object.__setattr__(self, "files_changed_set", frozenset(
+            diff.file_path for diff in self.file_diffs
+        ))
+        object.__setattr__(self, "python_files_changed_set", frozenset(
+            diff.file_path for diff in self.file_diffs if diff.is_python
+        ))
+    
     @property
     def files_changed(self) -> List[str]:
         """Get list of changed file paths."""
@@ -50,12 +85,8 @@ class Commit:
     
     def has_fix_keyword(self) -> bool:
         """Check if commit message suggests a bug fix."""
-        message_lower = self.message.lower()
-        fix_keywords = ['fix', 'bug', 'error', 'crash', 'broken', 'issue']
-        return any(keyword in message_lower for keyword in fix_keywords)
+        return self.is_fix
     
     def is_refactor(self) -> bool:
         """Check if commit message suggests intentional refactor."""
-        message_lower = self.message.lower()
-        refactor_keywords = ['refactor', 'cleanup', 'style', 'migration']
-        return any(keyword in message_lower for keyword in refactor_keywords)
+        return self._refactor
@@ -16,8 +16,11 @@ Ambiguity handling:
 - Detectors do not make epistemic judgments
 """
 import ast
-from dataclasses import dataclass
-from typing import Callable, Optional
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .utils import ModuleIndex
 
 
 @dataclass(frozen=True)
@@ -30,7 +33,9 @@ class DetectorContext:
     """
     function_node: Optional[ast.FunctionDef]  # Containing function if any
     class_node: Optional[ast.ClassDef]  # Containing class if any
-    module_imports: list[str]  # Import names in the module
+    module_imports: Tuple[str, ...]  # Import names in the module
+    # Shared per-module facts, when the caller built them
+    module_index: Optional["ModuleIndex"] = field(default=None, compare=False, repr=False)
     
     @property
     def in_function(self) -> bool:
@@ -11,7 +11,7 @@ Context/gating functions (like is_external_call) are in utils.py.
 import ast
 
 from . import DetectorContext
-from .utils import has_keyword_arg
+from .utils import any_node, has_keyword_arg
 
 
 def has_timeout_parameter(node: ast.AST, context: DetectorContext) -> bool:
@@ -39,16 +39,15 @@ def has_error_wrapper(node: ast.AST, context: DetectorContext) -> bool:
     Returns True if call appears within exception handler, False otherwise.
     
     Note: This is simplified - checks if parent function has try-except,
-    not if this specific call is wrapped.
+    not if this specific call is wrapped. Try blocks inside nested
+    functions are not counted.
     """
     if not context.in_function:
         return False
     
-    func = context.function_node
-    for child in ast.walk(func):
-        if isinstance(child, ast.Try):
-            return True
-    
-    return False
+    # Every node in a function shares this answer; the index walks it once
+    if context.module_index is not None:
+        return ast.Try in context.module_index.scope_node_types(context.function_node)
+    return any_node(context.function_node, lambda child: isinstance(child, ast.Try))
 
 
@@ -8,7 +8,7 @@ Each detector is a pure function: (node, context) -> bool
 import ast
 
 from . import DetectorContext
-from .utils import assigns_to_parameter
+from .utils import any_node, assigns_to_parameter
 
 
 def mutates_parameter(node: ast.AST, context: DetectorContext) -> bool:
@@ -32,14 +32,13 @@ def writes_global_state(node: ast.AST, context: DetectorContext) -> bool:
     
     Note: This is a conservative check - only detects explicit global declarations.
     Misses mutations via object attributes or list/dict modifications.
+    A 'global' inside a nested function belongs to that function, not this one.
     """
     if not isinstance(node, ast.FunctionDef):
         return False
     
-    for child in ast.walk(node):
-        if isinstance(child, ast.Global):
-            return True
-    
-    return False
+    if context.module_index is not None:
+        return ast.Global in context.module_index.scope_node_types(node)
+    return any_node(node, lambda child: isinstance(child, ast.Global))
 
 
@@ -5,11 +5,38 @@ These are pure helper functions, not class methods.
 Detectors use these as needed but remain standalone.
 """
 import ast
-from typing import Optional
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Collection, Dict, FrozenSet, List, Optional, Tuple
+
+# id(node) -> (enclosing function, enclosing class)
+ParentMap = Dict[int, Tuple[Optional[ast.FunctionDef], Optional[ast.ClassDef]]]
+
+# (node, enclosing function, enclosing class, function enclosing that function)
+Scope = Tuple[ast.AST, Optional[ast.FunctionDef], Optional[ast.ClassDef], Optional[ast.FunctionDef]]
 
 # Call detection utilities
 
-def is_call_to(node: ast.AST, target_names: list[str]) -> bool:
+# External call patterns, split so matching never formats "obj.method" strings.
+# Bare names match a plain call or a method of that name on any object.
+_EXT_NAMES: frozenset[str] = frozenset({
+    # HTTP libraries
+    "get", "post", "put", "delete",  # method names
+    "urlopen", "urllib",
+    # Database
+    "query", "execute", "fetchall", "fetchone",
+    # Filesystem
+    "open", "read", "write",
+})
+
+# Qualified (object, method) pairs
+_EXT_QUALIFIED: frozenset[tuple[str, str]] = frozenset({
+    ("requests", "get"), ("requests", "post"), ("requests", "put"), ("requests", "delete"),
+    ("db", "query"), ("session", "execute"), ("cursor", "execute"),
+})
+
+
+def is_call_to(node: ast.AST, target_names: Collection[str]) -> bool:
     """
     Check if node is a call to any of the target functions/methods.
     
@@ -62,19 +89,64 @@ def is_external_call(node: ast.AST) -> bool:
     
     Returns True if external call detected, False otherwise.
     """
-    external_patterns = [
-        # HTTP libraries
-        "requests.get", "requests.post", "requests.put", "requests.delete",
-        "get", "post", "put", "delete",  # method names
-        "urlopen", "urllib",
-        # Database
-        "query", "execute", "fetchall", "fetchone",
-        "db.query", "session.execute", "cursor.execute",
-        # Filesystem
-        "open", "read", "write",
-    ]
+    if not isinstance(node, ast.Call):
+        return False
+    
+    func = node.func
+    
+    if isinstance(func, ast.Name):
+        return func.id in _EXT_NAMES
+    
+    if isinstance(func, ast.Attribute):
+        if func.attr in _EXT_NAMES:
+            return True
+        return isinstance(func.value, ast.Name) and (func.value.id, func.attr) in _EXT_QUALIFIED
+    
+    return False
+
+
+# Traversal utilities
+
+# Nodes that open a new scope; their bodies do not belong to the enclosing function.
+_SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)
+
+
+def any_node(
+    root: ast.AST,
+    predicate: Callable[[ast.AST], bool],
+    stop_at: Tuple[type, ...] = _SCOPE_NODES,
+) -> bool:
+    """
+    Check if any node below root satisfies predicate.
+    
+    Depth-first with an explicit stack, returning on the first match.
+    Nodes of a stop_at type are tested but not descended into, so
+    nested scopes are not attributed to root. Root itself is not tested.
+    """
+    stack = list(ast.iter_child_nodes(root))
+    while stack:
+        node = stack.pop()
+        if predicate(node):
+            return True
+        if not isinstance(node, stop_at):
+            stack.extend(ast.iter_child_nodes(node))
+    return False
+
+
+def node_types_below(root: ast.AST, stop_at: Tuple[type, ...] = _SCOPE_NODES) -> FrozenSet[type]:
+    """
+    Exact types of every node any_node(root, ..., stop_at) would test.
     
-    return is_call_to(node, external_patterns)
+    Lets several isinstance checks against one scope share a single walk.
+    """
+    types = set()
+    stack = list(ast.iter_child_nodes(root))
+    while stack:
+        node = stack.pop()
+        types.add(type(node))
+        if not isinstance(node, stop_at):
+            stack.extend(ast.iter_child_nodes(node))
+    return frozenset(types)
 
 
 # Function name utilities
@@ -112,89 +184,119 @@ def assigns_to_parameter(func_node: ast.FunctionDef, exclude_self: bool = True)
     if exclude_self:
         param_names.discard('self')
     
-    # Look for assignments to these names
-    for node in ast.walk(func_node):
+    def rebinds_param(node: ast.AST) -> bool:
         if isinstance(node, ast.Assign):
-            for target in node.targets:
-                if isinstance(target, ast.Name) and target.id in param_names:
-                    return True
-        elif isinstance(node, ast.AugAssign):
-            if isinstance(node.target, ast.Name) and node.target.id in param_names:
-                return True
+            return any(
+                isinstance(target, ast.Name) and target.id in param_names
+                for target in node.targets
+            )
+        if isinstance(node, ast.AugAssign):
+            return isinstance(node.target, ast.Name) and node.target.id in param_names
+        return False
     
-    return False
+    # Nested functions, lambdas and classes bind their own names
+    return any_node(func_node, rebinds_param)
 
 
 # Context building utilities
 
-def build_context(node: ast.AST, tree: ast.Module):
+@dataclass
+class ModuleIndex:
+    """
+    Module-level facts derived from one walk of the tree.
+    
+    Built once per module and shared by every context built from it,
+    so imports and enclosing scopes are not re-derived per node.
+    
+    scopes has one (node, function, class, outer function) entry per
+    node, where outer function is the one enclosing function itself;
+    iterating it replaces a second walk plus per-node lookups.
+    """
+    tree: ast.Module
+    imports: Tuple[str, ...] = ()  # Frozen so every context can share it
+    parent_map: ParentMap = field(default_factory=dict)
+    scopes: List[Scope] = field(default_factory=list)
+    # id(function) -> node_types_below(function), filled on first use
+    _scope_types: Dict[int, FrozenSet[type]] = field(default_factory=dict, repr=False)
+    
+    def scope_node_types(self, func: ast.AST) -> FrozenSet[type]:
+        """node_types_below(func), walked once per function for all detectors."""
+        types = self._scope_types.get(id(func))
+        if types is None:
+            types = self._scope_types[id(func)] = node_types_below(func)
+        return types
+
+
+def build_module_index(tree: ast.Module) -> ModuleIndex:
+    """
+    Populate a ModuleIndex in a single breadth-first pass.
+    
+    parent_map entries are the innermost function/class strictly
+    containing the node, so a FunctionDef's own entry describes the
+    scope it is defined in.
+    """
+    index = ModuleIndex(tree=tree)
+    parent_map = index.parent_map
+    scopes = index.scopes
+    imports: List[str] = []
+    
+    # Children inherit the scope tuple, so nothing is looked up upward
+    todo = deque([(tree, None, None, None)])
+    while todo:
+        node, func, cls, outer = todo.popleft()
+        parent_map[id(node)] = (func, cls)
+        scopes.append((node, func, cls, outer))
+        
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            outer = func
+            func = node
+        elif isinstance(node, ast.ClassDef):
+            cls = node
+        elif isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.extend(_qualified_names(node))
+        
+        for child in ast.iter_child_nodes(node):
+            todo.append((child, func, cls, outer))
+    
+    index.imports = tuple(imports)
+    return index
+
+
+def build_context(node: ast.AST, tree: ast.Module, index: Optional[ModuleIndex] = None):
     """
     Build minimal context for a node within a module.
     
     Args:
         node: The AST node being inspected
         tree: The full module AST
+        index: Prebuilt build_module_index(tree). Pass one when building
+            contexts for many nodes of the same module.
         
     Returns:
         DetectorContext with parent function/class and imports
     """
     from . import DetectorContext
     
-    # Find parent function and class
-    parent_function = _find_parent_function(node, tree)
-    parent_class = _find_parent_class(node, tree)
+    if index is None:
+        index = build_module_index(tree)
     
-    # Extract imports
-    imports = _extract_imports(tree)
+    parent_function, parent_class = index.parent_map.get(id(node), (None, None))
     
     return DetectorContext(
         function_node=parent_function,
         class_node=parent_class,
-        module_imports=imports,
+        module_imports=index.imports,
+        module_index=index,
     )
 
 
-def _find_parent_function(node: ast.AST, tree: ast.Module) -> Optional[ast.FunctionDef]:
-    """Find the function containing this node, if any."""
-    for potential_parent in ast.walk(tree):
-        if isinstance(potential_parent, ast.FunctionDef):
-            for child in ast.walk(potential_parent):
-                if child is node:
-                    return potential_parent
-    return None
-
-
-def _find_parent_class(node: ast.AST, tree: ast.Module) -> Optional[ast.ClassDef]:
-    """Find the class containing this node, if any."""
-    for potential_parent in ast.walk(tree):
-        if isinstance(potential_parent, ast.ClassDef):
-            for child in ast.walk(potential_parent):
-                if child is node:
-                    return potential_parent
-    return None
-
-
-def _extract_imports(tree: ast.Module) -> list[str]:
-    """
-    Extract all imported names from a module.
-    
-    Returns list like: ['requests', 'os', 'json', 'pathlib.Path']
-    """
-    imports = []
-    
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Import):
-            for alias in node.names:
-                imports.append(alias.name)
-        elif isinstance(node, ast.ImportFrom):
-            module = node.module or ""
-            for alias in node.names:
-                if module:
-                    imports.append(f"{module}.{alias.name}")
-                else:
-                    imports.append(alias.name)
-    
-    return imports
+def _qualified_names(node: ast.ImportFrom) -> List[str]:
+    module = node.module or ""
+    if module:
+        return [f"{module}.{alias.name}" for alias in node.names]
+    return [alias.name for alias in node.names]
 
 
 def find_nodes_of_type(tree: ast.AST, node_type: type) -> list[ast.AST]:
@@ -4,16 +4,49 @@ Evaluation utilities for PPDE.
 This module handles bug labeling and validation logic.
 It is intentionally separate from data extraction.
 """
-from datetime import timedelta
-from typing import List, Optional
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 
 from ..data_structures import Commit
 
 
+@dataclass
+class FixIndex:
+    """
+    Lookup tables over one commit list, built once per evaluation pass.
+    
+    fix_indices holds the list positions of fix commits in ascending
+    order. When history timestamps never increase along the list,
+    neg_fix_epochs (aligned with fix_indices) is sorted and the time
+    window can be found by bisection.
+    """
+    sha_to_index:   Dict[str, int] = field(default_factory=dict)
+    fix_indices:    List[int] = field(default_factory=list)
+    neg_fix_epochs: List[int] = field(default_factory=list)
+    monotonic:      bool = True
+
+
+def build_fix_index(all_commits: List[Commit]) -> FixIndex:
+    """Index commits (newest first) by SHA and fix position."""
+    index = FixIndex()
+    previous = None
+    for i, commit in enumerate(all_commits):
+        index.sha_to_index.setdefault(commit.sha, i)
+        if previous is not None and commit.ts_epoch > previous:
+            index.monotonic = False
+        previous = commit.ts_epoch
+        if commit.is_fix:
+            index.fix_indices.append(i)
+            index.neg_fix_epochs.append(-commit.ts_epoch)
+    return index
+
+
 def find_subsequent_fix(
     commit: Commit,
     all_commits: List[Commit],
     max_days: int = 7,
+    fix_index: Optional[FixIndex] = None,
 ) -> Optional[Commit]:
     """
     Find if a commit had a subsequent fix within time window.
@@ -24,6 +57,8 @@ def find_subsequent_fix(
         commit: The commit to check
         all_commits: All commits in history (must be sorted newest first)
         max_days: Maximum days between commit and fix (default: 7)
+        fix_index: Prebuilt build_fix_index(all_commits). Pass one when
+            labeling many commits from the same history.
         
     Returns:
         The fix commit if found, None otherwise
@@ -33,30 +68,32 @@ def find_subsequent_fix(
     2. Has fix keyword in message
     3. Modifies at least one of the same files
     """
-    commit_index = None
-    for i, c in enumerate(all_commits):
-        if c.sha == commit.sha:
-            commit_index = i
-            break
+    if fix_index is None:
+        fix_index = build_fix_index(all_commits)
     
+    commit_index = fix_index.sha_to_index.get(commit.sha)
     if commit_index is None:
         return None
     
-    cutoff_time = commit.timestamp + timedelta(days=max_days)
-    changed_files = set(commit.files_changed)
+    cutoff_epoch = commit.ts_epoch + max_days * 86400
+    changed_files = commit.files_changed_set
     
-    # Look at commits that came after this one
-    for subsequent in all_commits[:commit_index]:
-        # Stop if outside time window
-        if subsequent.timestamp > cutoff_time:
-            continue
+    # Only fix commits that came after this one
+    end = bisect_left(fix_index.fix_indices, commit_index)
+    start = 0
+    if fix_index.monotonic:
+        # Skip fixes newer than the window without visiting them
+        start = bisect_left(fix_index.neg_fix_epochs, -cutoff_epoch, 0, end)
+    
+    for i in fix_index.fix_indices[start:end]:
+        subsequent = all_commits[i]
         
-        # Check if it's a fix
-        if not subsequent.has_fix_keyword():
+        # Outside time window (only reachable for non-monotonic history)
+        if subsequent.ts_epoch > cutoff_epoch:
             continue
         
         # Check if it touches same files
-        if set(subsequent.files_changed) & changed_files:
+        if not changed_files.isdisjoint(subsequent.files_changed_set):
             return subsequent
     
     return None
@@ -5,7 +5,8 @@ Translate Warnings to human-readable text.
 Three sentences: what happened, what's normal, why it's unusual.
 """
 from dataclasses import dataclass
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 
 from .context import Location, Stability
 from .frequency import SurpriseScore
@@ -50,35 +51,46 @@ _STABILITY_LABEL = {
 }
 
 
-def _sentence_observation(score: SurpriseScore) -> str:
-    key = (score.detector_name, score.observed)
-    return _OBSERVATION.get(key, _OBSERVATION_FALLBACK[score.observed])
-
-
-def _sentence_norm(score: SurpriseScore) -> str:
-    true_count = round(score.historical_freq * score.sample_size)
-    pct = f"{score.historical_freq:.0%}"
-    
-    loc_label  = _LOCATION_LABEL.get(score.context.location,  "this context")
-    stab_label = _STABILITY_LABEL.get(score.context.stability, "this file")
-    
+# What happened / what's normal / why it's unusual
+_TEMPLATE = (
+    "{obs}\n"
+    "In {loc_label} within {stab_label}, "
+    "this pattern is present {pct:.0%} of the time "
+    "({true_count} out of {sample_size}).\n"
+    "This deviation is unusual for you."
+)
+
+
+@lru_cache(maxsize=None)
+def _message_fragments(
+    detector_name: str,
+    observed: bool,
+    location: Location,
+    stability: Stability,
+) -> Tuple[str, str, str]:
+    """Vocabulary lookups for one (detector, context) pair; the key space is small and fixed."""
     return (
-        f"In {loc_label} within {stab_label}, "
-        f"this pattern is present {pct} of the time "
-        f"({true_count} out of {score.sample_size})."
+        _OBSERVATION.get((detector_name, observed), _OBSERVATION_FALLBACK[observed]),
+        _LOCATION_LABEL.get(location,  "this context"),
+        _STABILITY_LABEL.get(stability, "this file"),
     )
 
 
-def _sentence_deviation() -> str:
-    return "This deviation is unusual for you."
-
-
 def _build_message(score: SurpriseScore) -> str:
-    return "\n".join([
-        _sentence_observation(score),
-        _sentence_norm(score),
-        _sentence_deviation(),
-    ])
+    obs, loc_label, stab_label = _message_fragments(
+        score.detector_name,
+        score.observed,
+        score.context.location,
+        score.context.stability,
+    )
+    return _TEMPLATE.format(
+        obs=obs,
+        loc_label=loc_label,
+        stab_label=stab_label,
+        pct=score.historical_freq,
+        true_count=round(score.historical_freq * score.sample_size),
+        sample_size=score.sample_size,
+    )
 
 
 def explain(warnings: List[Warning]) -> List[Explanation]:
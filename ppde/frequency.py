@@ -4,51 +4,54 @@ Frequency Model - Step 4
 Historical pattern frequencies and surprise scores.
 Surprise = how often you do the opposite.
 """
+from collections import Counter
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Optional, Tuple
 
 from .context import PatternContext
 
 MIN_OBSERVATIONS = 10
 
-VIOLATION_DETECTORS = {
+VIOLATION_DETECTORS = frozenset({
     "has_timeout_parameter",
     "mutates_parameter",
     "writes_global_state",
     "has_broad_exception",
     "swallows_exception",
-}
+})
 
 
 @dataclass
 class FrequencyTable:
-    _counts: Dict[str, Dict[PatternContext, List[int]]] = field(default_factory=dict)
+    # Flat (detector, context, observed) -> count; missing keys read as 0
+    _counts: Counter = field(default_factory=Counter)
 
     def record(self, detector_name: str, context: PatternContext, observed: bool):
-        if detector_name not in self._counts:
-            self._counts[detector_name] = {}
-        if context not in self._counts[detector_name]:
-            self._counts[detector_name][context] = [0, 0]
-        
-        idx = 1 if observed else 0
-        self._counts[detector_name][context][idx] += 1
+        self._counts[(detector_name, context, observed)] += 1
+
+    def record_many(self, detector_name: str, context: PatternContext, observed: bool, count: int):
+        """Same as calling record() count times."""
+        self._counts[(detector_name, context, observed)] += count
+
+    def __bool__(self) -> bool:
+        """False until something is recorded (cold start)."""
+        return bool(self._counts)
+
+    def _observed_and_total(self, detector_name: str, context: PatternContext) -> Tuple[int, int]:
+        counts = self._counts
+        present = counts[(detector_name, context, True)]
+        return present, present + counts[(detector_name, context, False)]
 
     def total_observations(self, detector_name: str, context: PatternContext) -> int:
-        if detector_name not in self._counts:
-            return 0
-        if context not in self._counts[detector_name]:
-            return 0
-        counts = self._counts[detector_name][context]
-        return counts[0] + counts[1]
+        return self._observed_and_total(detector_name, context)[1]
 
     def frequency(self, detector_name: str, context: PatternContext) -> Optional[float]:
-        total = self.total_observations(detector_name, context)
+        present, total = self._observed_and_total(detector_name, context)
         if total < MIN_OBSERVATIONS:
             return None
         if total == 0:
             return None
-        counts = self._counts[detector_name][context]
-        return counts[1] / total
+        return present / total
 
 
 @dataclass(frozen=True)
@@ -71,6 +74,10 @@ def compute_surprise(
     Compare current observation to historical frequency.
     Returns None if detector is context-only or sample is too sparse.
     """
+    # Cold start: nothing can clear the sparsity gate
+    if not table:
+        return None
+    
     if detector_name not in VIOLATION_DETECTORS:
         return None
     
@@ -12,13 +12,66 @@ All operations are deterministic and reproducible.
 
 import re
 import subprocess
+import tempfile
 from collections import Counter
+from contextlib import closing
 from datetime import datetime, timedelta, timezone
+from functools import cached_property, partial
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from .data_structures import Commit, FileDiff
 
+__all__ = ["GitHistoryParser", "get_commit_history"]
+
+# git log record: NUL, then sha / author email / author time / raw message,
+# each NUL-terminated, followed by the commit's patch
+_RECORD_FORMAT = "%x00%H%x00%ae%x00%at%x00%B%x00"
+_RECORD_FIELDS = 5
+
+# One scan per patch: a file header, or a '+'/'-' line that is not a
+# '+++'/'---' marker. Everything else (context, hunk headers) is skipped.
+# Runs on the raw bytes; only the parts that are kept get decoded.
+_DIFF_LINE_RE = re.compile(rb"^(?:diff --git(?P<header>.*)|\+(?!\+\+)|-(?!--))", re.MULTILINE)
+
+_READ_SIZE = 1 << 16  # bytes per read from git's stdout
+
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="replace")
+
+
+def _normalize_newlines(data: bytes) -> bytes:
+    """Universal-newline translation, as a text-mode pipe would apply."""
+    if b"\r" not in data:
+        return data
+    return data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+
+def _split_nul(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Reassemble a stream of byte chunks into its NUL-separated fields."""
+    pending: List[bytes] = []
+    for chunk in chunks:
+        if b"\0" not in chunk:
+            pending.append(chunk)
+            continue
+        first, *middle, rest = chunk.split(b"\0")
+        pending.append(first)
+        yield b"".join(pending)
+        yield from middle
+        pending = [rest]
+    yield b"".join(pending)
+
+
+def _group_records(fields: Iterator[bytes]) -> Iterator[Tuple[bytes, ...]]:
+    """Group NUL-separated fields into records; a truncated record raises."""
+    for first in fields:
+        record = (first, *islice(fields, _RECORD_FIELDS - 1))
+        if len(record) != _RECORD_FIELDS:
+            raise RuntimeError(f"Truncated git log record: {len(record)} fields")
+        yield record
+
 
 class GitHistoryParser:
     """Extracts and filters commit history from a Git repository."""
@@ -52,11 +105,53 @@ class GitHistoryParser:
             )
         return result.returncode, result.stdout, result.stderr
 
+    def _stream_git(self, args: List[str]) -> Iterator[bytes]:
+        """
+        Yield git's raw stdout in chunks as it is produced.
+        
+        Nothing is decoded here; callers decode only what they keep.
+        Raises RuntimeError like _run_git if git fails. Closing the
+        iterator early terminates the git process.
+        """
+        # stderr goes to a file, not a second pipe: nothing reads it while
+        # stdout is streaming, and a full stderr pipe would block git.
+        with tempfile.TemporaryFile() as err:
+            proc = subprocess.Popen(
+                ["git"] + args,
+                cwd=self.repo_path,
+                stdout=subprocess.PIPE,
+                stderr=err,
+            )
+            try:
+                yield from iter(partial(proc.stdout.read, _READ_SIZE), b"")
+                if proc.wait() != 0:
+                    err.seek(0)
+                    stderr = _decode(err.read())
+                    raise RuntimeError(f"Git command failed: {' '.join(args)}\n{stderr}")
+            finally:
+                if proc.poll() is None:
+                    proc.kill()
+                proc.wait()
+                proc.stdout.close()
+
+    @cached_property
+    def _config(self) -> Dict[str, str]:
+        """Effective git config, read once with a single `git config -l`."""
+        code, stdout, _ = self._run_git(["config", "-z", "--list"], check=False)
+        config: Dict[str, str] = {}
+        if code != 0:
+            return config
+        # -z: "name\nvalue" entries, NUL-terminated; later entries win like --get
+        for entry in stdout.split("\0"):
+            if entry:
+                name, _, value = entry.partition("\n")
+                config[name] = value
+        return config
+
     def _get_config_value(self, section: str, key: str) -> Optional[str]:
-        code, stdout, _ = self._run_git(
-            ["config", "--get", f"{section}.{key}"], check=False
-        )
-        return stdout.strip() if code == 0 else None
+        # git lists section and key names lowercased
+        value = self._config.get(f"{section}.{key}".lower())
+        return value.strip() if value is not None else None
 
     def get_commits(
         self,
@@ -68,6 +163,10 @@ class GitHistoryParser:
         """
         Extract commits with temporal filtering.
 
+        git selects the window by committer date, so max_age_days bounds how
+        long ago a commit was committed. Commits whose author date is after
+        reference_time are then dropped; max_count counts the commits kept.
+
         Returns commits newest-first.
         """
 
@@ -80,49 +179,61 @@ class GitHistoryParser:
         if author_email is None:
             author_email = self._get_config_value("user", "email")
             if not author_email:
-                author_email = self._get_most_frequent_author()
+                author_email = self._most_frequent_author
 
-        _, stdout, _ = self._run_git(
+        since = reference_time - timedelta(days=max_age_days)
+
+        # One git process for the whole window: metadata, message and patch
+        # per commit. Each record is NUL-led and NUL-separated, and the patch
+        # runs up to the next record's leading NUL.
+        log = self._stream_git(
             [
                 "log",
                 "--no-merges",
-                "--format=%H|%ae|%at|%s",
+                "-p",
+                f"--format={_RECORD_FORMAT}",
                 f"--author={author_email}",
                 f"--max-count={max_count * 2}",  # fetch extra, filter later
+                # The age window is applied by git, so old commits are
+                # never walked or sent down the pipe
+                f"--since={since.isoformat()}",
+                f"--until={reference_time.isoformat()}",
+                # Keep every commit that touches the pathspec, not just
+                # the ones on the simplified history
+                "--full-history",
                 "HEAD",
+                "--",
+                "*.py",  # only Python commits, only Python hunks
             ]
         )
 
         commits: List[Commit] = []
 
-        for line in stdout.splitlines():
-            if not line:
-                continue
-
-            parts = line.split("|", 3)
-            if len(parts) != 4:
-                continue
+        # Records are parsed as git emits them; only one commit's patch is
+        # held at a time, and stopping early ends the git process.
+        with closing(log):
+            fields = _split_nul(log)
+            next(fields)  # whatever precedes the first record (nothing)
 
-            sha, email, ts, subject = parts
+            for sha, email, ts, message, diff_output in _group_records(fields):
+                commit_time = datetime.fromtimestamp(int(ts), tz=timezone.utc)
 
-            commit_time = datetime.fromtimestamp(int(ts), tz=timezone.utc)
-            delta = reference_time - commit_time
+                # --since/--until filter on committer date; this drops commits
+                # whose author date is after the reference time
+                if commit_time > reference_time:
+                    continue
 
-            # Commit must not be in the future
-            if delta.total_seconds() < 0:
-                continue
+                # The pathspec guarantees at least one Python file per commit
+                commits.append(self._parse_commit(
+                    sha.decode("ascii"),
+                    _decode(email),
+                    commit_time,
+                    _decode(_normalize_newlines(message)),
+                    _normalize_newlines(diff_output),
+                ))
 
-            # Enforce strict temporal window
-            if delta > timedelta(days=max_age_days):
-                break  # log is ordered newest → oldest
-
-            commit = self._parse_commit(sha, email, commit_time, subject)
-
-            if commit.python_files_changed:
-                commits.append(commit)
-
-            if len(commits) >= max_count:
-                break
+                if len(commits) >= max_count:
+                    break
 
         return commits
 
@@ -131,29 +242,39 @@ class GitHistoryParser:
         sha: str,
         author_email: str,
         timestamp: datetime,
-        subject: str,
+        message: str,
+        diff_output: bytes,
     ) -> Commit:
-        _, message, _ = self._run_git(["log", "-1", "--format=%B", sha])
-        _, diff_output, _ = self._run_git(["show", "--format=", sha])
-
         file_diffs: List[FileDiff] = []
-        current_file: Optional[str] = None
-        current_lines: List[str] = []
+        current_file: Optional[bytes] = None
+        start = additions = deletions = 0
+
+        # The regex yields only file headers and counted +/- lines, so
+        # context lines never reach Python.
+        for match in _DIFF_LINE_RE.finditer(diff_output):
+            header = match.group("header")
+            if header is None:
+                if match.group() == b"+":
+                    additions += 1
+                else:
+                    deletions += 1
+                continue
 
-        for line in diff_output.splitlines():
-            if line.startswith("diff --git"):
-                if current_file and current_file.endswith(".py"):
-                    file_diffs.append(self._build_diff(current_file, current_lines))
+            if current_file and current_file.endswith(b".py"):
+                file_diffs.append(self._build_diff(
+                    current_file, diff_output[start:match.start()], additions, deletions
+                ))
 
-                match = re.search(r" b/(.+)$", line)
-                current_file = match.group(1) if match else None
-                current_lines = [line]
-            else:
-                if current_file:
-                    current_lines.append(line)
+            # First " b/" with a non-empty remainder, as r" b/(.+)$" matched
+            _, sep, after = header.partition(b" b/")
+            current_file = after if sep and after else None
+            start = match.start()
+            additions = deletions = 0
 
-        if current_file and current_file.endswith(".py"):
-            file_diffs.append(self._build_diff(current_file, current_lines))
+        if current_file and current_file.endswith(b".py"):
+            file_diffs.append(self._build_diff(
+                current_file, diff_output[start:], additions, deletions
+            ))
 
         return Commit(
             sha=sha,
@@ -164,21 +285,18 @@ class GitHistoryParser:
         )
 
     @staticmethod
-    def _build_diff(path: str, lines: List[str]) -> FileDiff:
-        additions = sum(
-            1 for line in lines if line.startswith("+") and not line.startswith("+++")
-        )
-        deletions = sum(
-            1 for line in lines if line.startswith("-") and not line.startswith("---")
-        )
+    def _build_diff(path: bytes, text: bytes, additions: int, deletions: int) -> FileDiff:
+        # Decoding at file boundaries gives the same text as decoding the
+        # whole patch, since UTF-8 sequences never contain b"\n"
         return FileDiff(
-            file_path=path,
+            file_path=_decode(path),
             additions=additions,
             deletions=deletions,
-            diff_text="\n".join(lines),
+            diff_text=_decode(text[:-1] if text.endswith(b"\n") else text),
         )
 
-    def _get_most_frequent_author(self) -> str:
+    @cached_property
+    def _most_frequent_author(self) -> str:
         _, stdout, _ = self._run_git(
             ["log", "--format=%ae", "--max-count=100", "HEAD"]
         )
@@ -5,32 +5,34 @@ Glue layer. Wires Steps 1-6 together.
 No logic, no thresholds, no reasoning.
 """
 import ast
-from dataclasses import dataclass
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple
 
-from .context import assign_context
+from .context import (
+    FileHistoryIndex,
+    PatternContext,
+    assign_context,
+    build_file_history_index,
+)
 from .data_structures import Commit
 from .detectors import (
+    DetectorContext,
     has_broad_exception,
     has_timeout_parameter,
     mutates_parameter,
     swallows_exception,
     writes_global_state,
 )
+from .detectors.utils import build_module_index
 from .explanation import Explanation, explain
-from .frequency import FrequencyTable, compute_surprise
+from .frequency import FrequencyTable, SurpriseScore, compute_surprise
 from .git_history import get_commit_history
-from .warnings import gate_warnings
-
-
-@dataclass
-class DetectorContext:
-    function_node: ast.FunctionDef | None
-    class_node: ast.ClassDef | None
-    module_imports: List[str]
-
+from .warnings import Warning, gate_warnings
 
 _DETECTORS = {
     "has_timeout_parameter": has_timeout_parameter,
@@ -40,72 +42,23 @@ _DETECTORS = {
     "swallows_exception":    swallows_exception,
 }
 
+# Never descended into, alongside any hidden (dot) directory
+_SKIP_DIRS = frozenset({"venv", "__pycache__"})
 
-def _build_parent_map(tree: ast.Module) -> dict[ast.AST, ast.AST]:
-    parent_map = {}
-    for parent in ast.walk(tree):
-        for child in ast.iter_child_nodes(parent):
-            parent_map[child] = parent
-    return parent_map
-
-
-def _find_enclosing_function(
-    node: ast.AST,
-    parent_map: dict[ast.AST, ast.AST]
-) -> ast.FunctionDef | ast.AsyncFunctionDef | None:
-    current = node
-    while current in parent_map:
-        current = parent_map[current]
-        if isinstance(current, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            return current
-    return None
-
-
-def _find_enclosing_class(
-    node: ast.AST,
-    parent_map: dict[ast.AST, ast.AST]
-) -> ast.ClassDef | None:
-    current = node
-    while current in parent_map:
-        current = parent_map[current]
-        if isinstance(current, ast.ClassDef):
-            return current
-    return None
-
-
-def _find_parent_function(
-    func_node: ast.FunctionDef,
-    parent_map: dict[ast.AST, ast.AST]
-) -> ast.FunctionDef | ast.AsyncFunctionDef | None:
-    current = func_node
-    while current in parent_map:
-        current = parent_map[current]
-        if isinstance(current, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            return current
-    return None
-
-
-def _build_detector_context(
-    node: ast.AST,
-    tree: ast.Module,
-    parent_map: dict[ast.AST, ast.AST]
-) -> DetectorContext:
-    function_node = _find_enclosing_function(node, parent_map)
-    class_node = _find_enclosing_class(node, parent_map)
+# Below this many files, process start-up costs more than it saves
+_PARALLEL_MIN_FILES = 16
+_CHUNKSIZE = 8
 
+
+def _module_imports(tree: ast.Module) -> Tuple[str, ...]:
+    """Top-level imports: module names, with only the module of a from-import."""
     imports = []
-    for child in ast.iter_child_nodes(tree):
+    for child in tree.body:
         if isinstance(child, ast.Import):
             imports.extend(alias.name for alias in child.names)
-        elif isinstance(child, ast.ImportFrom):
-            if child.module:
-                imports.append(child.module)
-
-    return DetectorContext(
-        function_node=function_node,
-        class_node=class_node,
-        module_imports=imports,
-    )
+        elif isinstance(child, ast.ImportFrom) and child.module:
+            imports.append(child.module)
+    return tuple(imports)
 
 
 def _build_frequency_table(commits: List[Commit], repo_path: Path) -> FrequencyTable:
@@ -119,50 +72,140 @@ def _build_frequency_table(commits: List[Commit], repo_path: Path) -> FrequencyT
     return FrequencyTable()
 
 
-def _analyze_file(
+def _score_file(
     file_path: Path,
     repo_path: Path,
-    commits: List[Commit],
+    history: FileHistoryIndex,
     table: FrequencyTable,
     now: datetime,
-) -> List[Explanation]:
+) -> List[Warning]:
+    # Cold start: every score would be gated out, so skip the file entirely
+    if not table:
+        return []
+
+    # Parsed exactly once; bytes let the parser honour coding cookies
     try:
-        source = file_path.read_text(encoding="utf-8")
+        source = file_path.read_bytes()
         tree = ast.parse(source, filename=str(file_path))
     except (SyntaxError, UnicodeDecodeError):
         return []
 
-    parent_map = _build_parent_map(tree)
+    # One walk collects enclosing scopes for every node
+    index = build_module_index(tree)
+    # Computed once and shared by every context in this file
+    module_imports = _module_imports(tree)
     rel_path = str(file_path.relative_to(repo_path))
 
     scores = []
 
-    for node in ast.walk(tree):
-        detector_ctx = _build_detector_context(node, tree, parent_map)
-        
-        parent_func = None
-        if detector_ctx.function_node:
-            parent_func = _find_parent_function(detector_ctx.function_node, parent_map)
+    # Context depends only on (detector, enclosing scope) within a file, and
+    # the table does not change during analysis, so both are computed once
+    # per distinct key rather than once per node.
+    ctx_cache: Dict[tuple, PatternContext] = {}
+    surprise_cache: Dict[tuple, Optional[SurpriseScore]] = {}
+
+    for node, function_node, class_node, parent_func in index.scopes:
+        detector_ctx = DetectorContext(
+            function_node=function_node,
+            class_node=class_node,
+            module_imports=module_imports,
+            module_index=index,
+        )
 
         for detector_name, detector_func in _DETECTORS.items():
             observed = detector_func(node, detector_ctx)
 
-            context = assign_context(
-                detector_name=detector_name,
-                function_node=detector_ctx.function_node,
-                class_node=detector_ctx.class_node,
-                file_path=rel_path,
-                commits=commits,
-                now=now,
-                parent_function_node=parent_func,
-            )
-
-            score = compute_surprise(detector_name, context, observed, table)
+            ctx_key = (detector_name, function_node, class_node)
+            context = ctx_cache.get(ctx_key)
+            if context is None:
+                context = assign_context(
+                    detector_name=detector_name,
+                    function_node=function_node,
+                    class_node=class_node,
+                    file_path=rel_path,
+                    history=history,
+                    now=now,
+                    parent_function_node=parent_func,
+                )
+                ctx_cache[ctx_key] = context
+
+            score_key = (detector_name, context, observed)
+            if score_key in surprise_cache:
+                score = surprise_cache[score_key]
+            else:
+                score = compute_surprise(detector_name, context, observed, table)
+                surprise_cache[score_key] = score
             if score is not None:
                 scores.append(score)
 
-    warnings = gate_warnings(scores)
-    return explain(warnings)
+    return gate_warnings(scores)
+
+
+# Shared, read-only state for pool workers; set once per process by _init_worker
+_worker_state: Optional[Tuple[Path, FileHistoryIndex, FrequencyTable, datetime]] = None
+
+
+def _init_worker(
+    repo_path: Path,
+    history: FileHistoryIndex,
+    table: FrequencyTable,
+    now: datetime,
+) -> None:
+    global _worker_state
+    _worker_state = (repo_path, history, table, now)
+
+
+def _score_one_file(file_path: Path) -> List[Warning]:
+    repo_path, history, table, now = _worker_state
+    return _score_file(file_path, repo_path, history, table, now)
+
+
+def _score_files(
+    files: List[Path],
+    repo_path: Path,
+    history: FileHistoryIndex,
+    table: FrequencyTable,
+    now: datetime,
+) -> List[List[Warning]]:
+    """
+    Score each file, fanning out to worker processes for larger repos.
+    
+    Results are in input order. Falls back to serial scoring when the
+    platform cannot start a pool.
+    """
+    # An empty table scores nothing, so workers would only add start-up cost
+    if table and len(files) >= _PARALLEL_MIN_FILES:
+        # fork shares the imported detectors and the history index with
+        # workers instead of re-importing and pickling them per process
+        mp_context = multiprocessing.get_context("fork") if sys.platform == "linux" else None
+        try:
+            # No more workers than there are chunks to hand out
+            max_workers = min(os.cpu_count() or 1, -(-len(files) // _CHUNKSIZE))
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=mp_context,
+                initializer=_init_worker,
+                initargs=(repo_path, history, table, now),
+            ) as executor:
+                return list(executor.map(_score_one_file, files, chunksize=_CHUNKSIZE))
+        except OSError:
+            pass
+
+    return [_score_file(f, repo_path, history, table, now) for f in files]
+
+
+def _iter_py_files(repo_path: Path) -> Iterator[Path]:
+    """
+    Python files under repo_path, in sorted order.
+    
+    Hidden, venv and cache directories are pruned before descending, so
+    their contents (e.g. .git objects, site-packages) are never listed.
+    """
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d not in _SKIP_DIRS)
+        for name in sorted(files):
+            if name.endswith(".py") and not name.startswith("."):
+                yield Path(root, name)
 
 
 def analyze_repo(path: Path) -> List[Explanation]:
@@ -175,18 +218,15 @@ def analyze_repo(path: Path) -> List[Explanation]:
     repo_path = Path(path).resolve()
 
     commits = get_commit_history(str(repo_path))
+    history = build_file_history_index(commits)
     table = FrequencyTable()
     now = datetime.now(timezone.utc)
 
-    all_explanations = []
-
-    for file_path in repo_path.rglob("*.py"):
-        # Skip hidden, venv, cache
-        parts = file_path.relative_to(repo_path).parts
-        if any(p.startswith(".") or p == "venv" or p == "__pycache__" for p in parts):
-            continue
+    files = list(_iter_py_files(repo_path))
 
-        explanations = _analyze_file(file_path, repo_path, commits, table, now)
-        all_explanations.extend(explanations)
+    # Explanations are built here, per file, so wording never crosses processes
+    all_explanations = []
+    for warnings in _score_files(files, repo_path, history, table, now):
+        all_explanations.extend(explain(warnings))
 
     return all_explanations
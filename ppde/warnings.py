@@ -2,12 +2,13 @@
 Warning Gating - Step 5
 
 Filter, dedup, rank, cap.
-Pipeline: filter → dedup → rank → cap
+Pipeline: filter → dedup → rank+cap
 """
+import heapq
 from dataclasses import dataclass
 from typing import List
 
-from .context import Stability
+from .context import PatternContext, Stability
 from .frequency import SurpriseScore
 
 MIN_SURPRISE  = 0.6
@@ -56,33 +57,30 @@ def _dedup(scores: List[SurpriseScore]) -> List[SurpriseScore]:
             exact_key[key] = s
     
     # Operation collapse
-    op_key: dict[tuple, SurpriseScore] = {}
+    op_key: dict[PatternContext, SurpriseScore] = {}
     for s in exact_key.values():
-        key = (s.context, s.context.operation)
-        if key not in op_key or s.surprise > op_key[key].surprise:
-            op_key[key] = s
+        current = op_key.get(s.context)
+        if current is None or s.surprise > current.surprise:
+            op_key[s.context] = s
     
     return list(op_key.values())
 
 
-def _rank(scores: List[SurpriseScore]) -> List[SurpriseScore]:
-    return sorted(
-        scores,
-        key=lambda s: (
-            -s.surprise,
-            -s.sample_size,
-            _STABILITY_RANK.get(s.context.stability, 99),
-        ),
+def _rank_key(s: SurpriseScore) -> tuple:
+    return (
+        -s.surprise,
+        -s.sample_size,
+        _STABILITY_RANK.get(s.context.stability, 99),
     )
 
 
-def _cap(scores: List[SurpriseScore]) -> List[SurpriseScore]:
-    return scores[:MAX_WARNINGS]
+def _rank_and_cap(scores: List[SurpriseScore]) -> List[SurpriseScore]:
+    # Partial sort: same result as sorted(...)[:MAX_WARNINGS], ties in input order
+    return heapq.nsmallest(MAX_WARNINGS, scores, key=_rank_key)
 
 
 def gate_warnings(scores: List[SurpriseScore]) -> List[Warning]:
     filtered = _filter(scores)
     deduped  = _dedup(filtered)
-    ranked   = _rank(deduped)
-    capped   = _cap(ranked)
+    capped   = _rank_and_cap(deduped)
     return [Warning(score=s) for s in capped]
@@ -0,0 +1,24 @@
+"""
+Shared entry point for running one test module directly.
+
+`python tests/test_x.py` is the same as `pytest tests/test_x.py`, spread
+across cores when pytest-xdist is installed.
+"""
+import importlib.util
+import sys
+
+
+def main(test_file: str) -> int:
+    """
+    Run test_file under pytest, passing any extra command-line arguments on.
+
+    Runs in parallel when pytest-xdist is installed;
+    PYTEST_XDIST_AUTO_NUM_WORKERS caps the worker count on shared CI runners.
+    """
+    import pytest
+
+    args = [test_file]
+    if importlib.util.find_spec("xdist") is not None:
+        # loadfile keeps each module's classes together on one worker
+        args += ["-n", "auto", "--dist", "loadfile"]
+    return pytest.main(args + sys.argv[1:])
@@ -0,0 +1,32 @@
+"""Shared pytest setup."""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _ram_backed_tempdir():
+    """On Linux, put tempfile's directories (the tiny test git repos) on tmpfs.
+
+    Each session gets its own private directory from mkdtemp, removed at teardown.
+    """
+    if sys.platform != "linux" or not os.path.isdir("/dev/shm"):
+        yield
+        return
+
+    try:
+        session_dir = tempfile.mkdtemp(prefix="ppde-tests-", dir="/dev/shm")
+    except OSError:
+        yield
+        return
+
+    previous = tempfile.tempdir
+    tempfile.tempdir = session_dir
+    try:
+        yield
+    finally:
+        tempfile.tempdir = previous
+        shutil.rmtree(session_dir, ignore_errors=True)
@@ -8,13 +8,23 @@ Tests only:
 
 Does NOT test output formatting or full integration.
 """
+import contextlib
+import io
 import subprocess
 import sys
 import tempfile
 from pathlib import Path
 
+if __name__ == "__main__":  # run directly; under pytest, pyproject.toml sets the path
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import _runner
+import pytest
+
+from ppde.cli import build_parser, main
+
 ROOT = Path(__file__).resolve().parents[1]
-sys.path.insert(0, str(ROOT))
+
 
 def _init_git_repo(path: Path) -> None:
     """Initialize a bare Git repo with one commit."""
@@ -29,6 +39,14 @@ def _init_git_repo(path: Path) -> None:
     subprocess.run(["git", "commit", "-m", "init"], cwd=path, check=True, capture_output=True)
 
 
+def _run_main(argv: list[str]) -> tuple[int, str, str]:
+    """Call main() in-process, returning (exit code, stdout, stderr)."""
+    out, err = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        code = main(argv)
+    return code, out.getvalue(), err.getvalue()
+
+
 class TestCLI:
 
     def test_analyze_command_on_valid_repo(self):
@@ -37,6 +55,18 @@ class TestCLI:
             repo = Path(tmpdir)
             _init_git_repo(repo)
 
+            code, out, err = _run_main(["analyze", str(repo)])
+
+            assert code == 0, f"CLI failed: {err}"
+            assert "Analyzed repository:" in out
+            assert "Total findings:" in out
+
+    def test_module_entry_point_smoke(self):
+        """End-to-end: 'python -m ppde.cli analyze' in a fresh interpreter."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = Path(tmpdir)
+            _init_git_repo(repo)
+
             result = subprocess.run(
                 [sys.executable, "-m", "ppde.cli", "analyze", str(repo)],
                 cwd=ROOT,
@@ -46,32 +76,61 @@ class TestCLI:
 
             assert result.returncode == 0, f"CLI failed: {result.stderr}"
             assert "Analyzed repository:" in result.stdout
-            assert "Total findings:" in result.stdout
 
     def test_nonexistent_path_returns_error(self):
         """CLI exits with error on non-existent path."""
+        code, _, err = _run_main(["analyze", "/nonexistent/path"])
+
+        assert code == 1
+        assert "does not exist" in err
+
+    def test_non_git_repo_returns_error(self):
+        """CLI exits with error on non-Git directory."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            code, _, err = _run_main(["analyze", tmpdir])
+
+            assert code == 1
+            assert "Not a Git repository" in err
+
+    def test_help_matches_argparse(self):
+        """Preformatted --help output stays in sync with the real parser."""
+        code, out, _ = _run_main(["--help"])
+
+        assert code == 0
+        assert out == build_parser().format_help()
+
+    def test_no_command_prints_usage_error(self):
+        """Empty command line reports the missing subcommand like argparse."""
+        code, _, err = _run_main([])
+
+        assert code == 2
+        assert err.startswith(build_parser().format_usage())
+        assert "required" in err
+
+    def test_plain_analyze_skips_argparse(self):
+        """'analyze <path>' is handled without importing argparse (needs a fresh interpreter)."""
+        code = (
+            "import sys; from ppde.cli import main; "
+            "code = main(['analyze', '/nonexistent/path']); "
+            "print(code, 'argparse' in sys.modules)"
+        )
         result = subprocess.run(
-            [sys.executable, "-m", "ppde.cli", "analyze", "/nonexistent/path"],
+            [sys.executable, "-c", code],
             cwd=ROOT,
             capture_output=True,
             text=True,
         )
 
-        assert result.returncode == 1
-        assert "does not exist" in result.stderr
+        assert result.stdout.split() == ["1", "False"], result.stderr
 
-    def test_non_git_repo_returns_error(self):
-        """CLI exits with error on non-Git directory."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            result = subprocess.run(
-                [sys.executable, "-m", "ppde.cli", "analyze", tmpdir],
-                cwd=ROOT,
-                capture_output=True,
-                text=True,
-            )
+    def test_analyze_with_option_uses_argparse(self):
+        """Options after 'analyze' still get argparse's handling."""
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), pytest.raises(SystemExit) as exc_info:
+            main(["analyze", "--help"])
 
-            assert result.returncode == 1
-            assert "Not a Git repository" in result.stderr
+        assert exc_info.value.code == 0
+        assert "Path to Git repository" in out.getvalue()
 
     def test_default_path_is_current_directory(self):
         """If no path given, CLI analyzes current directory (must be a Git repo)."""
@@ -80,29 +139,9 @@ class TestCLI:
         pass
 
 
-def run_all_tests():
-    print("Running CLI tests...\n")
-
-    test_instance = TestCLI()
-    methods = [m for m in dir(test_instance) if m.startswith("test_") and not m.endswith("_is_current_directory")]
-
-    passed = 0
-    failed = 0
-
-    for method_name in sorted(methods):
-        label = f"CLI.{method_name}"
-        try:
-            getattr(test_instance, method_name)()
-            print(f"  ✓ {label}")
-            passed += 1
-        except Exception as e:
-            print(f"  ✗ {label}")
-            print(f"      {e}")
-            failed += 1
-
-    print(f"\n{'✅' if failed == 0 else '❌'} {passed} passed, {failed} failed")
-    return failed == 0
-
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
 
 if __name__ == "__main__":
-    sys.exit(0 if run_all_tests() else 1)
+    sys.exit(_runner.main(__file__))
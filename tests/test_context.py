@@ -9,12 +9,17 @@ Structure mirrors the three axes:
 Every design rule has at least one positive and one negative case.
 """
 import ast
+import dataclasses
+import re
 import sys
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
 
-ROOT = Path(__file__).resolve().parents[1]
-sys.path.insert(0, str(ROOT))
+if __name__ == "__main__":  # run directly; under pytest, pyproject.toml sets the path
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from _runner import main
 
 from ppde.context import (
     OPERATION_BY_DETECTOR,
@@ -25,8 +30,10 @@ from ppde.context import (
     _determine_location,
     _determine_stability,
     assign_context,
+    build_file_history_index,
+    intern_context,
 )
-from ppde.data_structures import Commit, FileDiff
+from ppde.data_structures import _FIX_KEYWORDS, _FIX_RE, Commit, FileDiff, epoch_seconds
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -34,23 +41,102 @@ from ppde.data_structures import Commit, FileDiff
 
 NOW = datetime(2026, 2, 3, 12, 0, 0)   # fixed reference point
 
+# Commit times for the ages the scenarios use; other ages are computed
+_TS_CACHE = {
+    d: NOW - timedelta(days=d)
+    for d in (1, 2, 5, 10, 15, 20, 29, 35, 40, 45, 50, 55, 60, 70, 90, 100, 110, 120, 150, 200)
+}
+
+
+_DIFF_PROTO = FileDiff(file_path="", additions=1, deletions=0, diff_text="")
 
+
+@lru_cache(maxsize=None)
 def _make_commit(
     file_path: str,
     message: str = "update",
     days_ago: float = 10,
     sha: str = "abc123",
 ) -> Commit:
-    """Minimal Commit factory for stability tests."""
+    """Minimal Commit factory for stability tests; cached, since nothing mutates commits."""
     return Commit(
         sha=sha,
         author_email="dev@example.com",
-        timestamp=NOW - timedelta(days=days_ago),
+        timestamp=_TS_CACHE.get(days_ago) or NOW - timedelta(days=days_ago),
         message=message,
-        file_diffs=[FileDiff(file_path=file_path, additions=1, deletions=0, diff_text="")],
+        file_diffs=[dataclasses.replace(_DIFF_PROTO, file_path=file_path)],
     )
 
 
+# Stability scenarios, built once at import and shared read-only by the tests
+_COMMITS = {
+    "new_today":  [_make_commit("app.py", days_ago=1, sha="a1")],
+    "new_29d":    [_make_commit("app.py", days_ago=29, sha="a2")],
+    "new_with_fixes": [
+        _make_commit("app.py", message="fix bug",  days_ago=5,  sha="n1"),
+        _make_commit("app.py", message="fix crash", days_ago=10, sha="n2"),
+        _make_commit("app.py", message="fix error", days_ago=15, sha="n3"),
+        _make_commit("app.py", message="initial",   days_ago=20, sha="n4"),
+    ],
+    "volatile_90d": [
+        _make_commit("app.py", message="fix bug",    days_ago=40, sha="v1"),
+        _make_commit("app.py", message="fix crash",  days_ago=50, sha="v2"),
+        _make_commit("app.py", message="fix broken", days_ago=60, sha="v3"),
+        # first-seen > 30 days
+        _make_commit("app.py", message="initial",    days_ago=200, sha="v4"),
+    ],
+    "two_fixes": [
+        _make_commit("app.py", message="fix bug",   days_ago=40, sha="v5"),
+        _make_commit("app.py", message="fix crash", days_ago=50, sha="v6"),
+        _make_commit("app.py", message="initial",   days_ago=200, sha="v7"),
+    ],
+    "volatile_and_modified": [
+        _make_commit("app.py", message="fix x",  days_ago=35, sha="vm1"),
+        _make_commit("app.py", message="fix y",  days_ago=45, sha="vm2"),
+        _make_commit("app.py", message="fix z",  days_ago=55, sha="vm3"),
+        _make_commit("app.py", message="refactor", days_ago=70, sha="vm4"),
+        _make_commit("app.py", message="initial",  days_ago=200, sha="vm5"),
+    ],
+    "modified_60d": [
+        _make_commit("app.py", message="add feature", days_ago=60, sha="m1"),
+        _make_commit("app.py", message="initial",     days_ago=200, sha="m2"),
+    ],
+    "modified_90d": [
+        _make_commit("app.py", message="tweak",  days_ago=90, sha="m3"),
+        _make_commit("app.py", message="initial", days_ago=200, sha="m4"),
+    ],
+    "stable_120d": [
+        _make_commit("app.py", message="initial", days_ago=120, sha="s1"),
+    ],
+    "old_fixes": [
+        _make_commit("app.py", message="fix bug",    days_ago=100, sha="s2"),
+        _make_commit("app.py", message="fix crash",  days_ago=110, sha="s3"),
+        _make_commit("app.py", message="fix broken", days_ago=120, sha="s4"),
+        _make_commit("app.py", message="initial",    days_ago=150, sha="s5"),
+    ],
+    "other_file": [_make_commit("other.py", days_ago=5, sha="d1")],
+}
+
+# The per-file aggregates _determine_stability reads, one index per scenario
+_HISTORIES = {name: build_file_history_index(commits) for name, commits in _COMMITS.items()}
+
+
+# One parse for all location snippets; _determine_location and assign_context only read the nodes
+(
+    _FUNC,          # def f(): pass
+    _METHOD_CLASS,  # class with a method
+    _BODY_CLASS,    # class with a bare statement
+    _OUTER,         # function with a nested function
+    _HELPER_CLASS,  # method with a nested helper
+) = ast.parse(
+    "def f(): pass\n"
+    "class C1:\n def m(self): pass\n"
+    "class C2:\n x = 1\n"
+    "def outer():\n def inner(): pass\n"
+    "class C3:\n def m(self):\n  def helper(): pass\n"
+).body
+
+
 # ---------------------------------------------------------------------------
 # 1. Location axis
 # ---------------------------------------------------------------------------
@@ -68,7 +154,7 @@ class TestDetermineLocation:
 
     def test_function_only_no_class_is_module_level(self):
         """Top-level function (not nested, not in a class) → MODULE_LEVEL."""
-        func = ast.parse("def f(): pass").body[0]
+        func = _FUNC
         assert _determine_location(
             function_node=func,
             class_node=None,
@@ -79,7 +165,7 @@ class TestDetermineLocation:
 
     def test_function_inside_class_is_class_method(self):
         """Function whose parent is a ClassDef → CLASS_METHOD."""
-        cls = ast.parse("class C:\n def m(self): pass").body[0]
+        cls = _METHOD_CLASS
         method = cls.body[0]
         assert _determine_location(
             function_node=method,
@@ -88,7 +174,7 @@ class TestDetermineLocation:
 
     def test_class_without_function_is_class_method(self):
         """Code directly inside a class body (no function wrapper) → CLASS_METHOD."""
-        cls = ast.parse("class C:\n x = 1").body[0]
+        cls = _BODY_CLASS
         assert _determine_location(
             function_node=None,
             class_node=cls,
@@ -98,7 +184,7 @@ class TestDetermineLocation:
 
     def test_function_inside_function_is_nested(self):
         """Inner function with an outer function → NESTED_FUNCTION."""
-        outer = ast.parse("def outer():\n def inner(): pass").body[0]
+        outer = _OUTER
         inner = outer.body[0]
         assert _determine_location(
             function_node=inner,
@@ -111,8 +197,7 @@ class TestDetermineLocation:
 
     def test_nested_inside_method_is_nested_not_method(self):
         """Nested function inside a class method → NESTED_FUNCTION, not CLASS_METHOD."""
-        src = "class C:\n def m(self):\n  def helper(): pass"
-        cls   = ast.parse(src).body[0]
+        cls   = _HELPER_CLASS
         method = cls.body[0]
         helper = method.body[0]
         assert _determine_location(
@@ -128,121 +213,125 @@ class TestDetermineLocation:
 
 class TestDetermineStability:
 
+    @staticmethod
+    def _stability(scenario: str, file_path: str = "app.py") -> Stability:
+        return _determine_stability(file_path, _HISTORIES[scenario], NOW)
+
     # --- NEW (highest precedence) ---
 
     def test_file_created_today_is_new(self):
-        commits = [_make_commit("app.py", days_ago=1, sha="a1")]
-        assert _determine_stability("app.py", commits, NOW) == Stability.NEW
+        assert self._stability("new_today") == Stability.NEW
 
     def test_file_created_29_days_ago_is_new(self):
-        commits = [_make_commit("app.py", days_ago=29, sha="a2")]
-        assert _determine_stability("app.py", commits, NOW) == Stability.NEW
+        assert self._stability("new_29d") == Stability.NEW
 
     def test_new_beats_volatile(self):
         """File < 30 days old with ≥ 3 fixes → NEW wins over VOLATILE."""
-        commits = [
-            _make_commit("app.py", message="fix bug",  days_ago=5,  sha="n1"),
-            _make_commit("app.py", message="fix crash", days_ago=10, sha="n2"),
-            _make_commit("app.py", message="fix error", days_ago=15, sha="n3"),
-            _make_commit("app.py", message="initial",   days_ago=20, sha="n4"),
-        ]
-        assert _determine_stability("app.py", commits, NOW) == Stability.NEW
+        assert self._stability("new_with_fixes") == Stability.NEW
 
     # --- VOLATILE ---
 
     def test_three_fixes_in_90_days_is_volatile(self):
-        commits = [
-            _make_commit("app.py", message="fix bug",    days_ago=40, sha="v1"),
-            _make_commit("app.py", message="fix crash",  days_ago=50, sha="v2"),
-            _make_commit("app.py", message="fix broken", days_ago=60, sha="v3"),
-            _make_commit("app.py", message="initial",    days_ago=200, sha="v4"),  # first-seen > 30 days
-        ]
-        assert _determine_stability("app.py", commits, NOW) == Stability.VOLATILE
+        assert self._stability("volatile_90d") == Stability.VOLATILE
 
     def test_two_fixes_is_not_volatile(self):
         """Only 2 fix-commits → does NOT reach VOLATILE threshold."""
-        commits = [
-            _make_commit("app.py", message="fix bug",   days_ago=40, sha="v5"),
-            _make_commit("app.py", message="fix crash", days_ago=50, sha="v6"),
-            _make_commit("app.py", message="initial",   days_ago=200, sha="v7"),
-        ]
         # 2 fixes + old file → falls through to MODIFIED (touched in 90 days)
-        assert _determine_stability("app.py", commits, NOW) == Stability.MODIFIED
+        assert self._stability("two_fixes") == Stability.MODIFIED
 
     def test_volatile_beats_modified(self):
         """≥ 3 fixes in 90 days takes priority even when file is also 'modified'."""
-        commits = [
-            _make_commit("app.py", message="fix x",  days_ago=35, sha="vm1"),
-            _make_commit("app.py", message="fix y",  days_ago=45, sha="vm2"),
-            _make_commit("app.py", message="fix z",  days_ago=55, sha="vm3"),
-            _make_commit("app.py", message="refactor", days_ago=70, sha="vm4"),
-            _make_commit("app.py", message="initial",  days_ago=200, sha="vm5"),
-        ]
-        assert _determine_stability("app.py", commits, NOW) == Stability.VOLATILE
+        assert self._stability("volatile_and_modified") == Stability.VOLATILE
 
     # --- MODIFIED ---
 
     def test_touched_in_90_days_no_fixes_is_modified(self):
-        commits = [
-            _make_commit("app.py", message="add feature", days_ago=60, sha="m1"),
-            _make_commit("app.py", message="initial",     days_ago=200, sha="m2"),
-        ]
-        assert _determine_stability("app.py", commits, NOW) == Stability.MODIFIED
+        assert self._stability("modified_60d") == Stability.MODIFIED
 
     def test_touched_exactly_at_90_days_is_modified(self):
         """Boundary: commit exactly 90 days ago is still within the window."""
-        commits = [
-            _make_commit("app.py", message="tweak",  days_ago=90, sha="m3"),
-            _make_commit("app.py", message="initial", days_ago=200, sha="m4"),
-        ]
-        assert _determine_stability("app.py", commits, NOW) == Stability.MODIFIED
+        assert self._stability("modified_90d") == Stability.MODIFIED
 
     # --- STABLE ---
 
     def test_no_changes_in_90_days_is_stable(self):
-        commits = [
-            _make_commit("app.py", message="initial", days_ago=120, sha="s1"),
-        ]
-        assert _determine_stability("app.py", commits, NOW) == Stability.STABLE
+        assert self._stability("stable_120d") == Stability.STABLE
 
     def test_only_old_fixes_is_stable(self):
         """Fix commits outside the 90-day window don't count toward VOLATILE."""
-        commits = [
-            _make_commit("app.py", message="fix bug",    days_ago=100, sha="s2"),
-            _make_commit("app.py", message="fix crash",  days_ago=110, sha="s3"),
-            _make_commit("app.py", message="fix broken", days_ago=120, sha="s4"),
-            _make_commit("app.py", message="initial",    days_ago=150, sha="s5"),
-        ]
-        assert _determine_stability("app.py", commits, NOW) == Stability.STABLE
+        assert self._stability("old_fixes") == Stability.STABLE
 
     # --- Default / edge ---
 
-    def test_unknown_file_defaults_to_modified(self):
-        """No commit in history touches this file → conservative default MODIFIED."""
-        commits = [_make_commit("other.py", days_ago=5, sha="d1")]
-        assert _determine_stability("missing.py", commits, NOW) == Stability.MODIFIED
+    def test_unknown_file_is_new(self):
+        """No commit in history touches this file → treated as NEW, so it is suppressed."""
+        assert self._stability("other_file", "missing.py") == Stability.NEW
+
+    def test_empty_history_is_new(self):
+        empty = build_file_history_index([])
+        assert _determine_stability("app.py", empty, NOW) == Stability.NEW
+
 
-    def test_empty_history_defaults_to_modified(self):
-        assert _determine_stability("app.py", [], NOW) == Stability.MODIFIED
+class TestFileHistoryIndex:
+
+    def test_first_and_last_seen_span_history(self):
+        commits = [
+            _make_commit("app.py", days_ago=5,   sha="h1"),
+            _make_commit("app.py", days_ago=50,  sha="h2"),
+            _make_commit("app.py", days_ago=200, sha="h3"),
+        ]
+        history = build_file_history_index(commits)
+        assert history.first_seen["app.py"] == epoch_seconds(NOW - timedelta(days=200))
+        assert history.last_modified["app.py"] == epoch_seconds(NOW - timedelta(days=5))
+
+    def test_only_fix_commits_are_recorded(self):
+        commits = [
+            _make_commit("app.py", message="fix bug",     days_ago=5,  sha="h4"),
+            _make_commit("app.py", message="add feature", days_ago=10, sha="h5"),
+        ]
+        history = build_file_history_index(commits)
+        assert history.fix_timestamps["app.py"] == [epoch_seconds(NOW - timedelta(days=5))]
+
+    def test_fix_keywords_use_one_compiled_pattern(self):
+        """Fix detection is a single precompiled scan with keyword-substring semantics."""
+        assert isinstance(_FIX_RE, re.Pattern)
+        for message in ("Fix crash", "hotfix", "update docs", "BROKEN build", "Issue #4"):
+            expected = any(keyword in message.lower() for keyword in _FIX_KEYWORDS)
+            assert _make_commit("app.py", message=message).is_fix == expected
+
+    def test_naive_and_aware_times_compare_as_utc(self):
+        commits = [_make_commit("app.py", days_ago=10, sha="h6")]
+        history = build_file_history_index(commits)
+        aware_now = NOW.replace(tzinfo=timezone.utc)
+        assert _determine_stability("app.py", history, aware_now) == Stability.NEW
+        later = aware_now + timedelta(days=20)
+        assert _determine_stability("app.py", history, later) == Stability.MODIFIED
+
+    def test_untouched_file_is_absent(self):
+        history = build_file_history_index([_make_commit("other.py", sha="h6")])
+        assert "app.py" not in history.first_seen
+        assert "app.py" not in history.fix_timestamps
 
 
 # ---------------------------------------------------------------------------
 # 3. Operation mapping
 # ---------------------------------------------------------------------------
 
+_EXPECTED_DETECTORS: frozenset[str] = frozenset({
+    "has_timeout_parameter",
+    "has_error_wrapper",
+    "mutates_parameter",
+    "writes_global_state",
+    "has_broad_exception",
+    "swallows_exception",
+})
+
+
 class TestOperationMapping:
 
     def test_all_current_detectors_are_mapped(self):
         """Every detector we ship must appear in the mapping."""
-        expected = {
-            "has_timeout_parameter",
-            "has_error_wrapper",
-            "mutates_parameter",
-            "writes_global_state",
-            "has_broad_exception",
-            "swallows_exception",
-        }
-        assert set(OPERATION_BY_DETECTOR.keys()) == expected
+        assert OPERATION_BY_DETECTOR.keys() == _EXPECTED_DETECTORS
 
     def test_unknown_detector_falls_back_to_computation(self):
         """Unregistered detector name → COMPUTATION (the safe default)."""
@@ -291,12 +380,12 @@ class TestAssignContext:
         ctx_timeout = assign_context(
             detector_name="has_timeout_parameter",
             function_node=None, class_node=None,
-            file_path="svc.py", commits=commits, now=NOW,
+            file_path="svc.py", history=build_file_history_index(commits), now=NOW,
         )
         ctx_broad = assign_context(
             detector_name="has_broad_exception",
             function_node=None, class_node=None,
-            file_path="svc.py", commits=commits, now=NOW,
+            file_path="svc.py", history=build_file_history_index(commits), now=NOW,
         )
 
         # Location and Stability are identical
@@ -308,7 +397,7 @@ class TestAssignContext:
 
     def test_class_method_mutation_stable(self):
         """Full wiring: class method + mutation detector + old file → expected tuple."""
-        cls  = ast.parse("class C:\n def m(self): pass").body[0]
+        cls  = _METHOD_CLASS
         meth = cls.body[0]
         commits = [_make_commit("models.py", days_ago=120, sha="w1")]
 
@@ -317,7 +406,7 @@ class TestAssignContext:
             function_node=meth,
             class_node=cls,
             file_path="models.py",
-            commits=commits,
+            history=build_file_history_index(commits),
             now=NOW,
         )
 
@@ -326,7 +415,7 @@ class TestAssignContext:
 
     def test_nested_function_new_file(self):
         """Nested function in a brand-new file."""
-        outer = ast.parse("def outer():\n def inner(): pass").body[0]
+        outer = _OUTER
         inner = outer.body[0]
         commits = [_make_commit("scratch.py", days_ago=2, sha="nf1")]
 
@@ -335,7 +424,7 @@ class TestAssignContext:
             function_node=inner,
             class_node=None,
             file_path="scratch.py",
-            commits=commits,
+            history=build_file_history_index(commits),
             now=NOW,
             parent_function_node=outer,
         )
@@ -349,47 +438,33 @@ class TestAssignContext:
         ctx = assign_context(
             detector_name="some_new_detector",
             function_node=None, class_node=None,
-            file_path="x.py", commits=commits, now=NOW,
+            file_path="x.py", history=build_file_history_index(commits), now=NOW,
         )
 
         assert ctx.operation == Operation.COMPUTATION
 
+    def test_identical_contexts_are_interned(self):
+        """Same (location, operation, stability) → the same shared instance."""
+        history = build_file_history_index([_make_commit("x.py", days_ago=200, sha="in1")])
+
+        first = assign_context(
+            detector_name="mutates_parameter",
+            function_node=None, class_node=None,
+            file_path="x.py", history=history, now=NOW,
+        )
+        second = assign_context(
+            detector_name="writes_global_state",
+            function_node=None, class_node=None,
+            file_path="x.py", history=history, now=NOW,
+        )
+
+        assert first is second
+        assert first is intern_context(Location.MODULE_LEVEL, Operation.MUTATION, Stability.STABLE)
+
 
 # ---------------------------------------------------------------------------
 # Runner
 # ---------------------------------------------------------------------------
 
-def run_all_tests():
-    print("Running context model tests...\n")
-
-    suites = [
-        ("Location",     TestDetermineLocation),
-        ("Stability",    TestDetermineStability),
-        ("Operation",    TestOperationMapping),
-        ("PatternCtx",   TestPatternContext),
-        ("Integration",  TestAssignContext),
-    ]
-
-    passed = 0
-    failed = 0
-
-    for suite_name, cls in suites:
-        instance = cls()
-        methods = [m for m in dir(instance) if m.startswith("test_")]
-        for method_name in sorted(methods):
-            label = f"{suite_name}.{method_name}"
-            try:
-                getattr(instance, method_name)()
-                print(f"  ✓ {label}")
-                passed += 1
-            except Exception as e:
-                print(f"  ✗ {label}")
-                print(f"      {e}")
-                failed += 1
-
-    print(f"\n{'✅' if failed == 0 else '❌'} {passed} passed, {failed} failed")
-    return failed == 0
-
-
 if __name__ == "__main__":
-    sys.exit(0 if run_all_tests() else 1)
+    sys.exit(main(__file__))
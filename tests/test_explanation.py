@@ -15,13 +15,17 @@ Structure:
     6. Immutability      - source objects are never touched
 """
 import sys
+from functools import lru_cache
 from pathlib import Path
 
-ROOT = Path(__file__).resolve().parents[1]
-sys.path.insert(0, str(ROOT))
+import pytest
 
+if __name__ == "__main__":  # run directly; under pytest, pyproject.toml sets the path
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from ppde.context import Location, Operation, PatternContext, Stability
+from _runner import main
+
+from ppde.context import Location, Operation, Stability, intern_context
 from ppde.explanation import Explanation, explain
 from ppde.frequency import SurpriseScore
 from ppde.warnings import Warning
@@ -31,7 +35,7 @@ from ppde.warnings import Warning
 # ---------------------------------------------------------------------------
 
 def _ctx(loc=Location.MODULE_LEVEL, op=Operation.EXTERNAL_CALL, stab=Stability.MODIFIED):
-    return PatternContext(loc, op, stab)
+    return intern_context(loc, op, stab)
 
 
 def _warning(
@@ -59,6 +63,59 @@ def _warning(
     return Warning(score=score)
 
 
+@lru_cache(maxsize=128)
+def _lines_for(**kwargs) -> tuple:
+    """Message lines for _warning(**kwargs), rendered and split once per distinct config."""
+    return tuple(explain([_warning(**kwargs)])[0].message.split("\n"))
+
+
+# The canonical default warning and its explanation, built once per module.
+# Both are frozen; tests that only read them share these instead of rebuilding.
+@pytest.fixture(scope="module")
+def default_warning():
+    return _warning()
+
+
+@pytest.fixture(scope="module")
+def default_explanation(default_warning):
+    return explain([default_warning])[0]
+
+
+_DETECTOR_OPS = (
+    ("has_timeout_parameter",  Operation.EXTERNAL_CALL),
+    ("mutates_parameter",      Operation.MUTATION),
+    ("writes_global_state",    Operation.MUTATION),
+    ("has_broad_exception",    Operation.ERROR_HANDLING),
+    ("swallows_exception",     Operation.ERROR_HANDLING),
+)
+
+
+@pytest.fixture(scope="module")
+def all_messages() -> tuple:
+    """
+    One message for every (detector, observed) pair, rendered once per module.
+    
+    Warnings and SurpriseScores are frozen, so every test can share them.
+    """
+    warnings = []
+    for det, op in _DETECTOR_OPS:
+        for obs in (True, False):
+            ctx = _ctx(op=op)
+            freq = 0.2 if obs else 0.8
+            surp = (1.0 - freq) if obs else freq
+            warnings.append(_warning(
+                detector=det, context=ctx,
+                observed=obs, historical_freq=freq, surprise=surp,
+            ))
+    return tuple(e.message for e in explain(warnings))
+
+
+# Test ids for all_messages, in the same order
+_MESSAGE_IDS = tuple(
+    f"{det}-{'present' if obs else 'absent'}" for det, _ in _DETECTOR_OPS for obs in (True, False)
+)
+
+
 # ---------------------------------------------------------------------------
 # 1. Output shape
 # ---------------------------------------------------------------------------
@@ -86,108 +143,120 @@ class TestOutputShape:
         assert result[1].warning is w2
         assert result[2].warning is w3
 
-    def test_explanation_wraps_warning(self):
-        w = _warning()
-        result = explain([w])
-        assert result[0].warning is w
+    def test_explanation_wraps_warning(self, default_warning, default_explanation):
+        assert default_explanation.warning is default_warning
 
-    def test_message_is_non_empty_string(self):
-        result = explain([_warning()])
-        assert isinstance(result[0].message, str)
-        assert len(result[0].message) > 0
+    def test_message_is_non_empty_string(self, default_explanation):
+        assert isinstance(default_explanation.message, str)
+        assert len(default_explanation.message) > 0
 
 
 # ---------------------------------------------------------------------------
 # 2. Observation sentence (sentence 1 - detector-specific)
 # ---------------------------------------------------------------------------
 
-class TestObservationSentence:
+# Every warning the observation tests read, explained in one batched call
+_PRESENT = dict(observed=True, surprise=0.8, historical_freq=0.2)
+_ABSENT = dict(observed=False)
+_MUTATION = _ctx(op=Operation.MUTATION)
+_ERROR = _ctx(op=Operation.ERROR_HANDLING)
+
+_OBSERVATION_CASES = {
+    "timeout_absent":   dict(detector="has_timeout_parameter", **_ABSENT),
+    "timeout_present":  dict(detector="has_timeout_parameter", **_PRESENT),
+    "mutates_absent":   dict(detector="mutates_parameter", context=_MUTATION, **_ABSENT),
+    "mutates_present":  dict(detector="mutates_parameter", context=_MUTATION, **_PRESENT),
+    "global_absent":    dict(detector="writes_global_state", context=_MUTATION, **_ABSENT),
+    "global_present":   dict(detector="writes_global_state", context=_MUTATION, **_PRESENT),
+    "broad_absent":     dict(detector="has_broad_exception", context=_ERROR, **_ABSENT),
+    "broad_present":    dict(detector="has_broad_exception", context=_ERROR, **_PRESENT),
+    "swallow_absent":   dict(detector="swallows_exception", context=_ERROR, **_ABSENT),
+    "swallow_present":  dict(detector="swallows_exception", context=_ERROR, **_PRESENT),
+    "unknown_absent":   dict(detector="some_future_detector", **_ABSENT),
+    "unknown_observed": dict(detector="some_future_detector", **_PRESENT),
+}
+
+
+@pytest.fixture(scope="module")
+def observation_lines():
+    """First line of each case's message, case-folded; the tests only check wording."""
+    explanations = explain([_warning(**kwargs) for kwargs in _OBSERVATION_CASES.values()])
+    return {
+        key: explanation.message.split("\n")[0].casefold()
+        for key, explanation in zip(_OBSERVATION_CASES, explanations, strict=True)
+    }
+
 
-    def _first_line(self, **kwargs) -> str:
-        return explain([_warning(**kwargs)])[0].message.split("\n")[0]
+class TestObservationSentence:
 
     # --- has_timeout_parameter ---
 
-    def test_timeout_absent(self):
-        line = self._first_line(detector="has_timeout_parameter", observed=False)
-        assert "timeout" in line.lower()
+    def test_timeout_absent(self, observation_lines):
+        line = observation_lines["timeout_absent"]
+        assert "timeout" in line
         # observed=False → pattern NOT present
-        assert "not" in line.lower() or "does not" in line.lower()
+        assert "not" in line or "does not" in line
 
-    def test_timeout_present(self):
-        line = self._first_line(detector="has_timeout_parameter", observed=True,
-                                surprise=0.8, historical_freq=0.2)
-        assert "timeout" in line.lower()
+    def test_timeout_present(self, observation_lines):
+        line = observation_lines["timeout_present"]
+        assert "timeout" in line
 
     # --- mutates_parameter ---
 
-    def test_mutates_absent(self):
-        line = self._first_line(detector="mutates_parameter", observed=False,
-                                context=_ctx(op=Operation.MUTATION))
-        assert "parameter" in line.lower()
+    def test_mutates_absent(self, observation_lines):
+        line = observation_lines["mutates_absent"]
+        assert "parameter" in line
 
-    def test_mutates_present(self):
-        line = self._first_line(detector="mutates_parameter", observed=True,
-                                context=_ctx(op=Operation.MUTATION),
-                                surprise=0.8, historical_freq=0.2)
-        assert "parameter" in line.lower()
-        assert "reassign" in line.lower()
+    def test_mutates_present(self, observation_lines):
+        line = observation_lines["mutates_present"]
+        assert "parameter" in line
+        assert "reassign" in line
 
     # --- writes_global_state ---
 
-    def test_global_absent(self):
-        line = self._first_line(detector="writes_global_state", observed=False,
-                                context=_ctx(op=Operation.MUTATION))
-        assert "global" in line.lower()
+    def test_global_absent(self, observation_lines):
+        line = observation_lines["global_absent"]
+        assert "global" in line
 
-    def test_global_present(self):
-        line = self._first_line(detector="writes_global_state", observed=True,
-                                context=_ctx(op=Operation.MUTATION),
-                                surprise=0.8, historical_freq=0.2)
-        assert "global" in line.lower()
+    def test_global_present(self, observation_lines):
+        line = observation_lines["global_present"]
+        assert "global" in line
 
     # --- has_broad_exception ---
 
-    def test_broad_absent(self):
-        line = self._first_line(detector="has_broad_exception", observed=False,
-                                context=_ctx(op=Operation.ERROR_HANDLING))
-        assert "exception" in line.lower()
-        assert "specific" in line.lower()
+    def test_broad_absent(self, observation_lines):
+        line = observation_lines["broad_absent"]
+        assert "exception" in line
+        assert "specific" in line
 
-    def test_broad_present(self):
-        line = self._first_line(detector="has_broad_exception", observed=True,
-                                context=_ctx(op=Operation.ERROR_HANDLING),
-                                surprise=0.8, historical_freq=0.2)
-        assert "broad" in line.lower()
+    def test_broad_present(self, observation_lines):
+        line = observation_lines["broad_present"]
+        assert "broad" in line
 
     # --- swallows_exception ---
 
-    def test_swallow_absent(self):
-        line = self._first_line(detector="swallows_exception", observed=False,
-                                context=_ctx(op=Operation.ERROR_HANDLING))
-        assert "swallow" in line.lower()
+    def test_swallow_absent(self, observation_lines):
+        line = observation_lines["swallow_absent"]
+        assert "swallow" in line
 
-    def test_swallow_present(self):
-        line = self._first_line(detector="swallows_exception", observed=True,
-                                context=_ctx(op=Operation.ERROR_HANDLING),
-                                surprise=0.8, historical_freq=0.2)
-        assert "swallow" in line.lower()
-        assert "silently" in line.lower()
+    def test_swallow_present(self, observation_lines):
+        line = observation_lines["swallow_present"]
+        assert "swallow" in line
+        assert "silently" in line
 
     # --- unknown detector fallback ---
 
-    def test_unknown_detector_does_not_crash(self):
-        line = self._first_line(detector="some_future_detector", observed=False)
+    def test_unknown_detector_does_not_crash(self, observation_lines):
+        line = observation_lines["unknown_absent"]
         assert len(line) > 0
 
-    def test_unknown_detector_uses_fallback(self):
-        line = self._first_line(detector="some_future_detector", observed=False)
-        assert "pattern" in line.lower()
+    def test_unknown_detector_uses_fallback(self, observation_lines):
+        line = observation_lines["unknown_absent"]
+        assert "pattern" in line
 
-    def test_unknown_detector_observed_true_fallback(self):
-        line = self._first_line(detector="some_future_detector", observed=True,
-                                surprise=0.8, historical_freq=0.2)
-        assert "pattern" in line.lower()
+    def test_unknown_detector_observed_true_fallback(self, observation_lines):
+        line = observation_lines["unknown_observed"]
+        assert "pattern" in line
 
 
 # ---------------------------------------------------------------------------
@@ -197,44 +266,20 @@ class TestObservationSentence:
 class TestNormSentence:
 
     def _second_line(self, **kwargs) -> str:
-        return explain([_warning(**kwargs)])[0].message.split("\n")[1]
-
-    # --- percentage rendering ---
-
-    def test_80_percent(self):
-        line = self._second_line(historical_freq=0.8, surprise=0.8, sample_size=15)
-        assert "80%" in line
-
-    def test_0_percent(self):
-        line = self._second_line(historical_freq=0.0, surprise=0.0, sample_size=10)
-        assert "0%" in line
-
-    def test_100_percent(self):
-        line = self._second_line(historical_freq=1.0, surprise=1.0, sample_size=12)
-        assert "100%" in line
-
-    def test_50_percent(self):
-        line = self._second_line(historical_freq=0.5, surprise=0.5, sample_size=20)
-        assert "50%" in line
-
-    # --- raw count rendering ---
-
-    def test_count_12_out_of_15(self):
-        """freq=0.8, sample=15 → round(0.8*15)=12."""
-        line = self._second_line(historical_freq=0.8, surprise=0.8, sample_size=15)
-        assert "12 out of 15" in line
-
-    def test_count_0_out_of_10(self):
-        line = self._second_line(historical_freq=0.0, surprise=0.0, sample_size=10)
-        assert "0 out of 10" in line
+        return _lines_for(**kwargs)[1]
 
-    def test_count_12_out_of_12(self):
-        line = self._second_line(historical_freq=1.0, surprise=1.0, sample_size=12)
-        assert "12 out of 12" in line
+    # --- percentage and raw count rendering ---
 
-    def test_count_10_out_of_20(self):
-        line = self._second_line(historical_freq=0.5, surprise=0.5, sample_size=20)
-        assert "10 out of 20" in line
+    @pytest.mark.parametrize("freq,sample,pct,count", [
+        (0.8, 15, "80%",  "12 out of 15"),   # round(0.8*15)=12
+        (0.0, 10, "0%",   "0 out of 10"),
+        (1.0, 12, "100%", "12 out of 12"),
+        (0.5, 20, "50%",  "10 out of 20"),
+    ])
+    def test_percent_and_count(self, freq, sample, pct, count):
+        line = self._second_line(historical_freq=freq, surprise=freq, sample_size=sample)
+        assert pct in line
+        assert count in line
 
     # --- location labels ---
 
@@ -278,86 +323,50 @@ class TestNormSentence:
 class TestDeviationSentence:
 
     def test_third_line_present(self):
-        lines = explain([_warning()])[0].message.split("\n")
-        assert len(lines) == 3
+        assert len(_lines_for()) == 3
 
     def test_third_line_contains_unusual(self):
-        last_line = explain([_warning()])[0].message.split("\n")[2]
+        last_line = _lines_for()[2]
         assert "unusual" in last_line.lower()
 
-    def test_third_line_is_same_for_every_detector(self):
+    def test_third_line_is_same_for_every_detector(self, all_messages):
         """Deviation sentence is structurally invariant - same for all detectors."""
-        detectors = [
-            ("has_timeout_parameter",  Operation.EXTERNAL_CALL),
-            ("mutates_parameter",      Operation.MUTATION),
-            ("writes_global_state",    Operation.MUTATION),
-            ("has_broad_exception",    Operation.ERROR_HANDLING),
-            ("swallows_exception",     Operation.ERROR_HANDLING),
-        ]
-        third_lines = set()
-        for det, op in detectors:
-            ctx = _ctx(op=op)
-            msg = explain([_warning(detector=det, context=ctx)])[0].message
-            third_lines.add(msg.split("\n")[2])
-
-        # All third lines must be identical
-        assert len(third_lines) == 1
+        first, *rest = all_messages
+        expected = first.split("\n")[2]
+        for msg, test_id in zip(rest, _MESSAGE_IDS[1:], strict=True):
+            assert msg.split("\n")[2] == expected, test_id
 
 
 # ---------------------------------------------------------------------------
 # 5. Forbidden content - exhaustive scan across all detectors × observed
 # ---------------------------------------------------------------------------
 
+# Advice and judgment wording. 'error' alone is factual (exception handlers),
+# so only its advice forms are blocked.
+_FORBIDDEN_WORDS = (
+    "should",
+    "best practice",
+    "bug",
+    "fix",
+    "recommend",
+    "this is an error",
+    "caused an error",
+)
+
+
+@pytest.fixture(scope="module")
+def folded_messages(all_messages):
+    return tuple(msg.casefold() for msg in all_messages)
+
+
 class TestForbiddenContent:
 
-    def _all_messages(self) -> list:
-        """Generate one message for every (detector, observed) pair."""
-        detectors = [
-            ("has_timeout_parameter",  Operation.EXTERNAL_CALL),
-            ("mutates_parameter",      Operation.MUTATION),
-            ("writes_global_state",    Operation.MUTATION),
-            ("has_broad_exception",    Operation.ERROR_HANDLING),
-            ("swallows_exception",     Operation.ERROR_HANDLING),
-        ]
-        warnings = []
-        for det, op in detectors:
-            for obs in (True, False):
-                ctx = _ctx(op=op)
-                freq = 0.2 if obs else 0.8
-                surp = (1.0 - freq) if obs else freq
-                warnings.append(_warning(
-                    detector=det, context=ctx,
-                    observed=obs, historical_freq=freq, surprise=surp,
-                ))
-        return [e.message for e in explain(warnings)]
-
-    def test_no_should(self):
-        for msg in self._all_messages():
-            assert "should" not in msg.lower(), f"Forbidden word 'should' in: {msg}"
-
-    def test_no_best_practice(self):
-        for msg in self._all_messages():
-            assert "best practice" not in msg.lower()
-
-    def test_no_bug(self):
-        for msg in self._all_messages():
-            assert "bug" not in msg.lower()
-
-    def test_no_fix(self):
-        for msg in self._all_messages():
-            assert "fix" not in msg.lower()
-
-    def test_no_recommend(self):
-        for msg in self._all_messages():
-            assert "recommend" not in msg.lower()
-
-    def test_no_error_word(self):
-        """'error' as advice/judgment. Note: 'error' in a factual detector name
-        observation is fine - we check it doesn't appear as standalone advice."""
-        for msg in self._all_messages():
-            # "error" in "exception handler" context is factual; block advice forms
-            assert "this is an error" not in msg.lower()
-            assert "caused an error" not in msg.lower()
+    # One case per (message, word), so xdist can spread them and a failure
+    # names both the detector and the word
+    @pytest.mark.parametrize("word", _FORBIDDEN_WORDS)
+    @pytest.mark.parametrize("index", range(len(_MESSAGE_IDS)), ids=_MESSAGE_IDS)
+    def test_no_forbidden_word(self, folded_messages, index, word):
+        assert word not in folded_messages[index]
 
 
 # ---------------------------------------------------------------------------
@@ -366,17 +375,13 @@ class TestForbiddenContent:
 
 class TestImmutability:
 
-    def test_warning_is_same_object(self):
+    def test_warning_is_same_object(self, default_warning, default_explanation):
         """The Warning inside the Explanation is the exact same object passed in."""
-        w = _warning()
-        result = explain([w])
-        assert result[0].warning is w
+        assert default_explanation.warning is default_warning
 
-    def test_score_is_same_object(self):
+    def test_score_is_same_object(self, default_warning, default_explanation):
         """SurpriseScore inside Warning is untouched."""
-        w = _warning()
-        result = explain([w])
-        assert result[0].warning.score is w.score
+        assert default_explanation.warning.score is default_warning.score
 
     def test_all_score_fields_unchanged(self):
         """Every field on SurpriseScore must be byte-identical before and after."""
@@ -405,38 +410,5 @@ class TestImmutability:
 # Runner
 # ---------------------------------------------------------------------------
 
-def run_all_tests():
-    print("Running explanation layer tests...\n")
-
-    suites = [
-        ("Shape",       TestOutputShape),
-        ("Observation", TestObservationSentence),
-        ("Norm",        TestNormSentence),
-        ("Deviation",   TestDeviationSentence),
-        ("Forbidden",   TestForbiddenContent),
-        ("Immutability",TestImmutability),
-    ]
-
-    passed = 0
-    failed = 0
-
-    for suite_name, cls in suites:
-        instance = cls()
-        methods = [m for m in dir(instance) if m.startswith("test_")]
-        for method_name in sorted(methods):
-            label = f"{suite_name}.{method_name}"
-            try:
-                getattr(instance, method_name)()
-                print(f"  ✓ {label}")
-                passed += 1
-            except Exception as e:
-                print(f"  ✗ {label}")
-                print(f"      {e}")
-                failed += 1
-
-    print(f"\n{'✅' if failed == 0 else '❌'} {passed} passed, {failed} failed")
-    return failed == 0
-
-
 if __name__ == "__main__":
-    sys.exit(0 if run_all_tests() else 1)
+    sys.exit(main(__file__))
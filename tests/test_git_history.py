@@ -1,114 +1,232 @@
-import shutil
-import tempfile
+import itertools
+import subprocess
 import time
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 import git
+import pytest
 
-from ppde.data_structures import Commit
-from ppde.evaluation import find_subsequent_fix
-from ppde.git_history import GitHistoryParser, get_commit_history
+from ppde.data_structures import Commit, FileDiff
+from ppde.evaluation import build_fix_index, find_subsequent_fix
+from ppde.git_history import GitHistoryParser, _group_records, get_commit_history
 
+_BRANCH_IDS = itertools.count()
 
-def _cleanup(path):
-    try:
-        shutil.rmtree(path)
-    except PermissionError:
-        time.sleep(0.1)
-        shutil.rmtree(path, ignore_errors=True)
+
+@pytest.fixture(scope="class")
+def shared_repo(tmp_path_factory):
+    """One initialized repo for the whole class, under pytest's managed temp dir."""
+    temp_dir = str(tmp_path_factory.mktemp("repo"))
+    repo = git.Repo.init(temp_dir)
+
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "Test User")
+        config.set_value("user", "email", "test@example.com")
+
+    yield temp_dir, repo
+    repo.close()
+
+
+@pytest.fixture
+def git_repo(shared_repo, request):
+    """The shared repo on a fresh orphan branch: no commits, empty index and work tree."""
+    temp_dir, repo = shared_repo
+    # Node names of parametrized tests contain brackets, which git rejects in refs
+    repo.git.checkout("--orphan", f"{request.node.originalname}-{next(_BRANCH_IDS)}")
+    repo.git.rm("-r", "-f", "-q", "--ignore-unmatch", ".")
+    return temp_dir, repo
 
 
 class TestGitHistoryParser:
     @staticmethod
-    def create_test_repo():
-        temp_dir = tempfile.mkdtemp()
-        repo = git.Repo.init(temp_dir)
+    def _seed_commits(repo, commits, author_email="test@example.com", future_authored=()):
+        """Commit each (filename, content, message) in order, in one git fast-import run.
+
+        Only the current branch is written; the index and work tree are left alone.
+        Commits whose index is in future_authored get an author date a day ahead.
+        """
+        branch = repo.head.ref.path
+        when = int(time.time())
+        stream = bytearray()
+        for i, (filename, content, message) in enumerate(commits):
+            message, content = message.encode(), content.encode()
+            stream += b"commit %s\n" % branch.encode()
+            if i in future_authored:
+                stream += b"author Test User <%s> %d +0000\n" % (
+                    author_email.encode(), when + 86400
+                )
+            stream += b"committer Test User <%s> %d +0000\n" % (author_email.encode(), when)
+            stream += b"data %d\n%s\n" % (len(message), message)
+            stream += b"M 100644 inline %s\n" % filename.encode()
+            stream += b"data %d\n%s\n\n" % (len(content), content)
+        subprocess.run(
+            ["git", "-C", repo.working_dir, "fast-import", "--quiet"],
+            input=bytes(stream), check=True,
+        )
 
-        with repo.config_writer() as config:
-            config.set_value("user", "name", "Test User")
-            config.set_value("user", "email", "test@example.com")
+    def test_basic_commit_extraction(self, git_repo):
+        temp_dir, repo = git_repo
+        self._seed_commits(repo, [
+            ("test.py", "print('hi')", "Initial"),
+            ("test.py", "print('hello')", "Update"),
+        ])
+
+        parser = GitHistoryParser(temp_dir)
+        commits = parser.get_commits(author_email="test@example.com")
+
+        assert len(commits) == 2
+        assert commits[0].message == "Update"
+        assert commits[1].message == "Initial"
+
+    def test_non_python_commits_are_skipped(self, git_repo):
+        temp_dir, repo = git_repo
+        self._seed_commits(repo, [
+            ("app.py", "x = 1", "Add app"),
+            ("README.md", "docs", "Write docs"),
+            ("pkg/mod.py", "y = 2", "Add module"),
+        ])
+
+        commits = GitHistoryParser(temp_dir).get_commits(author_email="test@example.com")
+
+        assert [c.message for c in commits] == ["Add module", "Add app"]
+        assert commits[0].files_changed == ["pkg/mod.py"]
+
+    def test_config_values_are_read_once(self, git_repo):
+        temp_dir, repo = git_repo
+        parser = GitHistoryParser(temp_dir)
+
+        assert parser._get_config_value("user", "email") == "test@example.com"
+        assert parser._get_config_value("user", "Name") == "Test User"
+        assert parser._get_config_value("user", "missing") is None
+        assert parser._config is parser._config
+
+    def test_max_count_stops_streaming_early(self, git_repo):
+        temp_dir, repo = git_repo
+        self._seed_commits(repo, [
+            ("test.py", f"x = {i}", f"Commit {i}\n\nBody {i}") for i in range(3)
+        ])
+
+        commits = GitHistoryParser(temp_dir).get_commits(
+            author_email="test@example.com", max_count=2
+        )
 
-        return temp_dir, repo
+        assert [c.message for c in commits] == ["Commit 2\n\nBody 2", "Commit 1\n\nBody 1"]
+        assert commits[0].file_diffs[0].additions == 1
 
-    @staticmethod
-    def add_commit(repo, filename, content, message, author_email="test@example.com"):
-        path = Path(repo.working_dir) / filename
-        path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(content)
-
-        repo.index.add([filename])
-        repo.index.commit(
-            message, author=git.Actor("Test User", author_email)
+    def test_max_count_counts_commits_after_author_date_filter(self, git_repo):
+        temp_dir, repo = git_repo
+        self._seed_commits(repo, [
+            ("test.py", f"x = {i}", f"Commit {i}") for i in range(3)
+        ], future_authored={2})
+
+        commits = GitHistoryParser(temp_dir).get_commits(
+            author_email="test@example.com", max_count=2
         )
 
-    def test_basic_commit_extraction(self):
-        temp_dir, repo = self.create_test_repo()
-        try:
-            self.add_commit(repo, "test.py", "print('hi')", "Initial")
-            self.add_commit(repo, "test.py", "print('hello')", "Update")
+        assert [c.message for c in commits] == ["Commit 1", "Commit 0"]
 
-            parser = GitHistoryParser(temp_dir)
-            commits = parser.get_commits(author_email="test@example.com")
+    def test_truncated_record_raises(self):
+        fields = [b"sha", b"a@example.com", b"0", b"msg", b"patch", b"sha2", b"a@example.com"]
 
-            assert len(commits) == 2
-            assert commits[0].message == "Update"
-            assert commits[1].message == "Initial"
-        finally:
-            _cleanup(temp_dir)
+        records = _group_records(iter(fields))
 
-    def test_temporal_filtering(self):
-        temp_dir, repo = self.create_test_repo()
-        try:
-            self.add_commit(repo, "test.py", "x", "Commit")
+        assert next(records) == (b"sha", b"a@example.com", b"0", b"msg", b"patch")
+        with pytest.raises(RuntimeError, match="Truncated"):
+            next(records)
 
-            parser = GitHistoryParser(temp_dir)
-            ref = datetime.now(timezone.utc)
+    def test_patch_bytes_decode_like_text(self, git_repo):
+        temp_dir, repo = git_repo
+        path = Path(temp_dir) / "enc.py"
+        path.write_bytes(b"a = 1\r\nb = '\xff'\r\n")
+        repo.index.add(["enc.py"])
+        repo.index.commit("Add enc", author=git.Actor("Test User", "test@example.com"))
 
-            commits = parser.get_commits(
-                author_email="test@example.com",
-                max_age_days=1,
-                reference_time=ref,
-            )
-            assert len(commits) == 1
+        commits = GitHistoryParser(temp_dir).get_commits(author_email="test@example.com")
+
+        diff = commits[0].file_diffs[0]
+        assert diff.additions == 2
+        assert "\r" not in diff.diff_text
+        assert "\ufffd" in diff.diff_text
+
+    def test_temporal_filtering(self, git_repo):
+        temp_dir, repo = git_repo
+        self._seed_commits(repo, [("test.py", "x", "Commit")])
 
-            commits = parser.get_commits(
+        parser = GitHistoryParser(temp_dir)
+        ref = datetime.now(timezone.utc)
+
+        commits = parser.get_commits(
+            author_email="test@example.com",
+            max_age_days=1,
+            reference_time=ref,
+        )
+        assert len(commits) == 1
+
+        commits = parser.get_commits(
+            author_email="test@example.com",
+            max_age_days=0,
+            reference_time=ref - timedelta(days=1),
+        )
+        assert len(commits) == 0
+
+        # Commits newer than the reference time are outside the window
+        commits = parser.get_commits(
+            author_email="test@example.com",
+            max_age_days=30,
+            reference_time=ref - timedelta(days=1),
+        )
+        assert len(commits) == 0
+
+    def test_subsequent_fix_detection(self, git_repo):
+        temp_dir, repo = git_repo
+        self._seed_commits(repo, [
+            ("api.py", "requests.get(url)", "Add API"),
+            ("api.py", "requests.get(url, timeout=30)", "Fix: add timeout"),
+        ])
+
+        parser = GitHistoryParser(temp_dir)
+        commits = parser.get_commits(author_email="test@example.com")
+
+        original = commits[1]
+        fix = find_subsequent_fix(original, commits, max_days=7)
+
+        assert fix is not None
+        assert "fix" in fix.message.lower()
+
+    def test_subsequent_fix_with_shared_index(self):
+        def make(sha, days, message, path):
+            return Commit(
+                sha=sha,
                 author_email="test@example.com",
-                max_age_days=0,
-                reference_time=ref - timedelta(days=1),
-            )
-            assert len(commits) == 0
-        finally:
-            _cleanup(temp_dir)
-
-    def test_subsequent_fix_detection(self):
-        temp_dir, repo = self.create_test_repo()
-        try:
-            self.add_commit(repo, "api.py", "requests.get(url)", "Add API")
-            self.add_commit(
-                repo,
-                "api.py",
-                "requests.get(url, timeout=30)",
-                "Fix: add timeout",
+                timestamp=base + timedelta(days=days),
+                message=message,
+                file_diffs=[FileDiff(path, 1, 0, "")],
             )
 
-            parser = GitHistoryParser(temp_dir)
-            commits = parser.get_commits(author_email="test@example.com")
-
-            original = commits[1]
-            fix = find_subsequent_fix(original, commits, max_days=7)
-
-            assert fix is not None
-            assert "fix" in fix.message.lower()
-        finally:
-            _cleanup(temp_dir)
-
-    def test_convenience_function(self):
-        temp_dir, repo = self.create_test_repo()
-        try:
-            self.add_commit(repo, "test.py", "code", "Test commit")
-            commits = get_commit_history(temp_dir, author_email="test@example.com")
-            assert len(commits) == 1
-            assert isinstance(commits[0], Commit)
-        finally:
-            _cleanup(temp_dir)
+        base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        commits = [  # newest first
+            make("e", 20, "Fix late crash", "api.py"),
+            make("d", 5, "Fix other module", "db.py"),
+            make("c", 3, "Fix timeout", "api.py"),
+            make("b", 1, "Tweak api", "api.py"),
+            make("a", 0, "Add api", "api.py"),
+        ]
+        index = build_fix_index(commits)
+
+        assert find_subsequent_fix(commits[4], commits, fix_index=index).sha == "c"
+        assert find_subsequent_fix(commits[1], commits, fix_index=index) is None
+        assert find_subsequent_fix(commits[0], commits, fix_index=index) is None
+
+        # Out-of-order timestamps fall back to checking every earlier fix
+        shuffled = [commits[2], commits[0], commits[1], commits[3], commits[4]]
+        index = build_fix_index(shuffled)
+        assert not index.monotonic
+        assert find_subsequent_fix(shuffled[4], shuffled, fix_index=index).sha == "c"
+
+    def test_convenience_function(self, git_repo):
+        temp_dir, repo = git_repo
+        self._seed_commits(repo, [("test.py", "code", "Test commit")])
+        commits = get_commit_history(temp_dir, author_email="test@example.com")
+        assert len(commits) == 1
+        assert isinstance(commits[0], Commit)
@@ -6,35 +6,84 @@ Uses a tiny fake Git repo. Asserts on:
     - Detector names that triggered
 Does NOT assert on wording or exact content.
 """
-import subprocess
+import ast
+import os
+import shutil
 import sys
 import tempfile
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-
-ROOT = Path(__file__).resolve().parents[1]
-sys.path.insert(0, str(ROOT))
-
-
-from ppde.orchestrator import analyze_repo
+from typing import Dict
+
+if __name__ == "__main__":  # run directly; under pytest, pyproject.toml sets the path
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import git
+import pytest
+from _runner import main
+
+import ppde.orchestrator as orchestrator
+from ppde.context import FileHistoryIndex, Location, Operation, PatternContext, Stability
+from ppde.data_structures import epoch_seconds
+from ppde.frequency import VIOLATION_DETECTORS, FrequencyTable
+from ppde.orchestrator import (
+    _DETECTORS,
+    _PARALLEL_MIN_FILES,
+    _iter_py_files,
+    _module_imports,
+    _score_file,
+    _score_files,
+    analyze_repo,
+)
 
 # ---------------------------------------------------------------------------
 # Fake repo setup
 # ---------------------------------------------------------------------------
 
 def _init_git_repo(path: Path) -> None:
-    """Initialize a bare Git repo with one commit."""
-    subprocess.run(["git", "init"], cwd=path, check=True, capture_output=True)
-    subprocess.run(["git", "config", "user.email", "test@example.com"],
-                   cwd=path, check=True, capture_output=True)
-    subprocess.run(["git", "config", "user.name", "Test User"],
-                   cwd=path, check=True, capture_output=True)
+    """Initialize a Git repo with one commit."""
+    repo = git.Repo.init(path)
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "Test User")
+        config.set_value("user", "email", "test@example.com")
 
     # Create a dummy file and commit it
-    dummy = path / "README.md"
-    dummy.write_text("# Test Repo\n")
-    subprocess.run(["git", "add", "README.md"], cwd=path, check=True, capture_output=True)
-    subprocess.run(["git", "commit", "-m", "Initial commit"],
-                   cwd=path, check=True, capture_output=True)
+    (path / "README.md").write_text("# Test Repo\n")
+    repo.index.add(["README.md"])
+    repo.index.commit("Initial commit", author=git.Actor("Test User", "test@example.com"))
+    repo.close()
+
+
+@pytest.fixture(scope="module")
+def template_repo():
+    """The one-commit repo, built once per module and removed after its last test."""
+    template = tempfile.TemporaryDirectory()
+    try:
+        _init_git_repo(Path(template.name))
+        yield Path(template.name)
+    finally:
+        template.cleanup()
+
+
+@pytest.fixture
+def repo_path(template_repo, tmp_path):
+    """A fresh copy of the template repo; copying is much cheaper than git init."""
+    shutil.copytree(template_repo, tmp_path, dirs_exist_ok=True)
+    return tmp_path
+
+
+def _write_files(root: Path, files: Dict[str, str]) -> None:
+    """Write each relative path -> text under root, creating parent directories."""
+    for name, text in files.items():
+        path = os.path.join(root, name)
+        parent = os.path.dirname(name)
+        if parent:
+            os.makedirs(os.path.join(root, parent), exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, text.encode())
+        finally:
+            os.close(fd)
 
 
 # ---------------------------------------------------------------------------
@@ -43,28 +92,20 @@ def _init_git_repo(path: Path) -> None:
 
 class TestOrchestrator:
 
-    def test_empty_repo_returns_empty(self):
+    def test_empty_repo_returns_empty(self, repo_path):
         """A repo with no Python files → no explanations."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            repo_path = Path(tmpdir)
-            _init_git_repo(repo_path)
+        result = analyze_repo(repo_path)
+        assert result == []
 
-            result = analyze_repo(repo_path)
-            assert result == []
-
-    def test_file_with_no_violations_returns_empty(self):
+    def test_file_with_no_violations_returns_empty(self, repo_path):
         """A Python file with no detectable patterns → no explanations."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            repo_path = Path(tmpdir)
-            _init_git_repo(repo_path)
-
-            # Write a trivial Python file
-            (repo_path / "simple.py").write_text("x = 1 + 2\n")
+        # Write a trivial Python file
+        _write_files(repo_path, {"simple.py": "x = 1 + 2\n"})
 
-            result = analyze_repo(repo_path)
-            # With an empty frequency table, no patterns will have enough
-            # historical data to produce surprise scores.
-            assert result == []
+        result = analyze_repo(repo_path)
+        # With an empty frequency table, no patterns will have enough
+        # historical data to produce surprise scores.
+        assert result == []
 
     def test_non_git_repo_raises_valueerror(self):
         """Passing a non-Git directory raises ValueError."""
@@ -80,91 +121,139 @@ class TestOrchestrator:
 
     def test_ignores_hidden_and_venv_directories(self):
         """Hidden dirs (.git) and venv dirs are skipped."""
+        # Only file discovery is under test, so no repo or analysis is needed
         with tempfile.TemporaryDirectory() as tmpdir:
             repo_path = Path(tmpdir)
-            _init_git_repo(repo_path)
 
             # Create Python files in excluded locations
-            (repo_path / ".hidden").mkdir()
-            (repo_path / ".hidden" / "test.py").write_text("x = 1\n")
+            _write_files(repo_path, {
+                ".hidden/test.py": "x = 1\n",
+                "venv/test.py":    "x = 2\n",
+            })
 
-            (repo_path / "venv").mkdir()
-            (repo_path / "venv" / "test.py").write_text("x = 2\n")
-
-            result = analyze_repo(repo_path)
             # These files should be skipped
-            assert result == []
+            assert list(_iter_py_files(repo_path)) == []
 
-    def test_skips_unparseable_python_files(self):
+    def test_skips_unparseable_python_files(self, repo_path):
         """Files with syntax errors are silently skipped."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            repo_path = Path(tmpdir)
-            _init_git_repo(repo_path)
-
-            # Write invalid Python
-            (repo_path / "broken.py").write_text("def foo(\n")
-
-            result = analyze_repo(repo_path)
-            # Should not crash, just skip the file
-            assert result == []
-
-    def test_nested_function_detection_works(self):
+        # Write invalid Python
+        _write_files(repo_path, {"broken.py": "def foo(\n"})
+
+        result = analyze_repo(repo_path)
+        # Should not crash, just skip the file
+        assert result == []
+
+    @pytest.mark.parametrize("source", [
+        b"def foo(\n",
+        b"requests.get('\xff')\n",
+    ], ids=["syntax-error", "non-utf8"])
+    def test_score_file_skips_unparseable_source(self, tmp_path, source):
+        """With a non-empty table the parser runs, and a failed parse scores nothing."""
+        now = datetime.now(timezone.utc)
+        old = epoch_seconds(now - timedelta(days=365))
+
+        broken = tmp_path / "broken.py"
+        broken.write_bytes(source)
+        history = FileHistoryIndex()
+        history.first_seen["broken.py"] = old
+        history.last_modified["broken.py"] = old
+
+        table = FrequencyTable()
+        ctx = PatternContext(Location.MODULE_LEVEL, Operation.EXTERNAL_CALL, Stability.STABLE)
+        for _ in range(10):
+            table.record("has_timeout_parameter", ctx, True)
+
+        assert _score_file(broken, tmp_path, history, table, now) == []
+
+    def test_module_imports_are_top_level_module_names(self):
+        """Detector contexts see top-level imports only, from-imports by module."""
+        tree = ast.parse(
+            "import os, json\n"
+            "from pathlib import Path\n"
+            "from . import sibling\n"
+            "def f():\n"
+            "    import requests\n"
+        )
+        assert _module_imports(tree) == ("os", "json", "pathlib")
+
+    def test_nested_function_detection_works(self, repo_path):
         """Verify parent tracking correctly identifies nested functions."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            repo_path = Path(tmpdir)
-            _init_git_repo(repo_path)
-
-            # Write code with nested function
-            (repo_path / "nested.py").write_text("""
+        # Write code with nested function
+        _write_files(repo_path, {"nested.py": """
 def outer():
     def inner():
         pass
     return inner
-""")
+"""})
 
-            result = analyze_repo(repo_path)
-            # Should not crash - this verifies parent map works
-            assert isinstance(result, list)
+        result = analyze_repo(repo_path)
+        # Should not crash - this verifies parent map works
+        assert isinstance(result, list)
 
-    def test_returns_explanation_objects(self):
+    def test_returns_explanation_objects(self, repo_path):
         """Result is a list of Explanation objects (even if empty)."""
+        _write_files(repo_path, {"dummy.py": "# empty\n"})
+
+        result = analyze_repo(repo_path)
+        assert isinstance(result, list)
+
+    def test_only_scorable_detectors_run(self):
+        """Context-only detectors would always score None, so none are wired in."""
+        assert _DETECTORS.keys() <= VIOLATION_DETECTORS
+
+    def test_parallel_scoring_matches_serial(self):
+        """Pooled scoring returns the same warnings, in file order, as a serial pass."""
         with tempfile.TemporaryDirectory() as tmpdir:
             repo_path = Path(tmpdir)
-            _init_git_repo(repo_path)
+            now = datetime.now(timezone.utc)
+            old = epoch_seconds(now - timedelta(days=365))
 
-            (repo_path / "dummy.py").write_text("# empty\n")
+            # Every other file passes a timeout, so warnings differ per file
+            sources = {
+                f"mod{i}.py": f"requests.get(url{', timeout=5' if i % 2 else ''})\n"
+                for i in range(_PARALLEL_MIN_FILES + 4)
+            }
+            _write_files(repo_path, sources)
+            files = [repo_path / name for name in sources]
 
-            result = analyze_repo(repo_path)
-            assert isinstance(result, list)
+            history = FileHistoryIndex()
+            for name in sources:
+                history.first_seen[name] = old
+                history.last_modified[name] = old
 
+            # Historically, module-level external calls always had a timeout
+            table = FrequencyTable()
+            ctx = PatternContext(Location.MODULE_LEVEL, Operation.EXTERNAL_CALL, Stability.STABLE)
+            for _ in range(10):
+                table.record("has_timeout_parameter", ctx, True)
 
-# ---------------------------------------------------------------------------
-# Runner
-# ---------------------------------------------------------------------------
+            serial = [_score_file(f, repo_path, history, table, now) for f in files]
+            parallel = _score_files(files, repo_path, history, table, now)
 
-def run_all_tests():
-    print("Running orchestrator end-to-end tests...\n")
+            assert parallel == serial
+            assert any(parallel), "Fixture should produce at least one warning"
 
-    test_instance = TestOrchestrator()
-    methods = [m for m in dir(test_instance) if m.startswith("test_")]
+    def test_cold_start_never_starts_a_pool(self, tmp_path, monkeypatch):
+        """With an empty table there is nothing to score, so no workers are spawned."""
+        def no_pool(*args, **kwargs):
+            raise AssertionError("ProcessPoolExecutor should not be used")
 
-    passed = 0
-    failed = 0
+        monkeypatch.setattr(orchestrator, "ProcessPoolExecutor", no_pool)
 
-    for method_name in sorted(methods):
-        label = f"Orchestrator.{method_name}"
-        try:
-            getattr(test_instance, method_name)()
-            print(f"  ✓ {label}")
-            passed += 1
-        except Exception as e:
-            print(f"  ✗ {label}")
-            print(f"      {e}")
-            failed += 1
+        sources = {f"mod{i}.py": "requests.get(url)\n" for i in range(_PARALLEL_MIN_FILES + 4)}
+        _write_files(tmp_path, sources)
+        files = [tmp_path / name for name in sources]
+
+        result = _score_files(
+            files, tmp_path, FileHistoryIndex(), FrequencyTable(), datetime.now(timezone.utc),
+        )
+
+        assert result == [[] for _ in files]
 
-    print(f"\n{'✅' if failed == 0 else '❌'} {passed} passed, {failed} failed")
-    return failed == 0
 
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
 
 if __name__ == "__main__":
-    sys.exit(0 if run_all_tests() else 1)
+    sys.exit(main(__file__))
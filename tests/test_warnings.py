@@ -14,10 +14,14 @@ through the full pipeline.
 import sys
 from pathlib import Path
 
-ROOT = Path(__file__).resolve().parents[1]
-sys.path.insert(0, str(ROOT))
+import pytest
 
-from ppde.context import Location, Operation, PatternContext, Stability
+if __name__ == "__main__":  # run directly; under pytest, pyproject.toml sets the path
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from _runner import main
+
+from ppde.context import Location, Operation, Stability, intern_context
 from ppde.frequency import SurpriseScore
 from ppde.warnings import (
     HIGH_SURPRISE,
@@ -31,7 +35,7 @@ from ppde.warnings import (
 # ---------------------------------------------------------------------------
 
 def _ctx(loc=Location.MODULE_LEVEL, op=Operation.EXTERNAL_CALL, stab=Stability.MODIFIED):
-    return PatternContext(loc, op, stab)
+    return intern_context(loc, op, stab)
 
 
 def _score(
@@ -68,12 +72,9 @@ class TestSurpriseThreshold:
         scores = [_score(MIN_SURPRISE - 0.01)]
         assert gate_warnings(scores) == []
 
-    def test_exactly_at_threshold_passes(self):
-        scores = [_score(MIN_SURPRISE)]
-        assert len(gate_warnings(scores)) == 1
-
-    def test_above_threshold_passes(self):
-        scores = [_score(0.9)]
+    @pytest.mark.parametrize("surprise", [MIN_SURPRISE, 0.9], ids=["at", "above"])
+    def test_at_or_above_threshold_passes(self, surprise):
+        scores = [_score(surprise)]
         assert len(gate_warnings(scores)) == 1
 
     def test_empty_input_returns_empty(self):
@@ -88,13 +89,10 @@ class TestStabilitySuppression:
 
     # --- NEW: always suppressed ---
 
-    def test_new_context_suppressed_regardless_of_surprise(self):
+    @pytest.mark.parametrize("surprise", [1.0, HIGH_SURPRISE], ids=["max", "high"])
+    def test_new_context_suppressed_regardless_of_surprise(self, surprise):
         """Even surprise = 1.0 is suppressed when stability is NEW."""
-        scores = [_score(1.0, context=_ctx(stab=Stability.NEW))]
-        assert gate_warnings(scores) == []
-
-    def test_new_context_suppressed_at_high_surprise(self):
-        scores = [_score(HIGH_SURPRISE, context=_ctx(stab=Stability.NEW))]
+        scores = [_score(surprise, context=_ctx(stab=Stability.NEW))]
         assert gate_warnings(scores) == []
 
     # --- VOLATILE: requires HIGH_SURPRISE ---
@@ -103,22 +101,18 @@ class TestStabilitySuppression:
         scores = [_score(HIGH_SURPRISE - 0.01, context=_ctx(stab=Stability.VOLATILE))]
         assert gate_warnings(scores) == []
 
-    def test_volatile_exactly_at_high_surprise_passes(self):
-        scores = [_score(HIGH_SURPRISE, context=_ctx(stab=Stability.VOLATILE))]
-        assert len(gate_warnings(scores)) == 1
-
-    def test_volatile_above_high_surprise_passes(self):
-        scores = [_score(0.95, context=_ctx(stab=Stability.VOLATILE))]
+    @pytest.mark.parametrize("surprise", [HIGH_SURPRISE, 0.95], ids=["at", "above"])
+    def test_volatile_at_or_above_high_surprise_passes(self, surprise):
+        scores = [_score(surprise, context=_ctx(stab=Stability.VOLATILE))]
         assert len(gate_warnings(scores)) == 1
 
     # --- MODIFIED / STABLE: normal rules ---
 
-    def test_modified_passes_at_min_surprise(self):
-        scores = [_score(MIN_SURPRISE, context=_ctx(stab=Stability.MODIFIED))]
-        assert len(gate_warnings(scores)) == 1
-
-    def test_stable_passes_at_min_surprise(self):
-        scores = [_score(MIN_SURPRISE, context=_ctx(stab=Stability.STABLE))]
+    @pytest.mark.parametrize(
+        "stab", [Stability.MODIFIED, Stability.STABLE], ids=["modified", "stable"]
+    )
+    def test_normal_stability_passes_at_min_surprise(self, stab):
+        scores = [_score(MIN_SURPRISE, context=_ctx(stab=stab))]
         assert len(gate_warnings(scores)) == 1
 
 
@@ -158,26 +152,42 @@ class TestDeduplication:
         assert warnings[0].score.detector_name == "swallows_exception"
         assert warnings[0].score.surprise == 0.85
 
-    def test_different_operations_are_independent(self):
-        """EXTERNAL_CALL and MUTATION in same location - both survive."""
-        ctx_ext  = _ctx(op=Operation.EXTERNAL_CALL, stab=Stability.STABLE)
-        ctx_mut  = _ctx(op=Operation.MUTATION,       stab=Stability.STABLE)
-        scores = [
-            _score(0.8, detector="has_timeout_parameter", context=ctx_ext),
-            _score(0.75, detector="mutates_parameter",    context=ctx_mut),
-        ]
-        warnings = gate_warnings(scores)
-        assert len(warnings) == 2
-
-    def test_same_operation_different_locations_are_independent(self):
-        """Same operation but different Location → different (context, operation) keys."""
-        ctx_mod = _ctx(loc=Location.MODULE_LEVEL, op=Operation.ERROR_HANDLING, stab=Stability.STABLE)
-        ctx_cls = _ctx(loc=Location.CLASS_METHOD,  op=Operation.ERROR_HANDLING, stab=Stability.STABLE)
+    def test_operation_collapse_tie_keeps_first_detector_key(self):
+        """
+        A tie on surprise goes to the detector whose exact key came first,
+        even when its best score arrives after the other detector's.
+        """
+        ctx = _ctx(stab=Stability.STABLE)
         scores = [
-            _score(0.7,  detector="has_broad_exception", context=ctx_mod),
-            _score(0.85, detector="swallows_exception",  context=ctx_cls),
+            _score(0.7, detector="has_timeout_parameter", context=ctx, sample_size=10),
+            _score(0.9, detector="mutates_parameter", context=ctx, sample_size=11),
+            _score(0.9, detector="has_timeout_parameter", context=ctx, sample_size=50),
         ]
         warnings = gate_warnings(scores)
+        assert len(warnings) == 1
+        assert warnings[0].score.detector_name == "has_timeout_parameter"
+        assert warnings[0].score.sample_size == 50
+
+    @pytest.mark.parametrize("first,second", [
+        # EXTERNAL_CALL and MUTATION in same location - both survive
+        (
+            _score(0.8,  detector="has_timeout_parameter",
+                   context=_ctx(op=Operation.EXTERNAL_CALL, stab=Stability.STABLE)),
+            _score(0.75, detector="mutates_parameter",
+                   context=_ctx(op=Operation.MUTATION, stab=Stability.STABLE)),
+        ),
+        # Same operation but different Location → different (context, operation) keys
+        (
+            _score(0.7,  detector="has_broad_exception",
+                   context=_ctx(loc=Location.MODULE_LEVEL, op=Operation.ERROR_HANDLING,
+                                stab=Stability.STABLE)),
+            _score(0.85, detector="swallows_exception",
+                   context=_ctx(loc=Location.CLASS_METHOD, op=Operation.ERROR_HANDLING,
+                                stab=Stability.STABLE)),
+        ),
+    ], ids=["different-operations", "different-locations"])
+    def test_distinct_contexts_are_independent(self, first, second):
+        warnings = gate_warnings([first, second])
         assert len(warnings) == 2
 
 
@@ -191,7 +201,8 @@ class TestRanking:
         ctx = _ctx(stab=Stability.STABLE)
         scores = [
             _score(0.7,  detector="has_timeout_parameter", context=ctx),
-            _score(0.9,  detector="mutates_parameter",     context=_ctx(op=Operation.MUTATION, stab=Stability.STABLE)),
+            _score(0.9,  detector="mutates_parameter",
+                   context=_ctx(op=Operation.MUTATION, stab=Stability.STABLE)),
         ]
         warnings = gate_warnings(scores)
         assert warnings[0].score.surprise == 0.9
@@ -226,52 +237,41 @@ class TestRanking:
 # 5. Max warnings cap (Rule 5)
 # ---------------------------------------------------------------------------
 
+# Distinct (location, operation) pairs so dedup doesn't collapse them
+_CAP_TEST_GRID = tuple(
+    (loc, op, det)
+    for loc in (Location.MODULE_LEVEL, Location.CLASS_METHOD, Location.NESTED_FUNCTION)
+    for op, det in zip(
+        (Operation.EXTERNAL_CALL, Operation.MUTATION, Operation.ERROR_HANDLING),
+        ("has_timeout_parameter", "mutates_parameter", "has_broad_exception"),
+        strict=True,
+    )
+)
+
+# MAX_WARNINGS + 3 valid scores, built once; descending surprise so ranking
+# is deterministic.
+_CAP_SCORES = tuple(
+    _score(0.95 - i * 0.01, detector=det, context=_ctx(loc, op, Stability.STABLE))
+    for i, (loc, op, det) in enumerate(_CAP_TEST_GRID[:MAX_WARNINGS + 3])
+)
+
+
 class TestWarningsCap:
 
+    def test_grid_has_enough_distinct_contexts(self):
+        """The cap tests need MAX_WARNINGS + 3 scores that dedup keeps apart."""
+        assert len(_CAP_TEST_GRID) >= MAX_WARNINGS + 3
+        assert len({s.context for s in _CAP_SCORES}) == MAX_WARNINGS + 3
+
     def test_more_than_max_is_truncated(self):
-        """Generate MAX_WARNINGS + 3 valid scores across distinct operations/locations.
+        """MAX_WARNINGS + 3 valid scores across distinct operations/locations.
         Only MAX_WARNINGS should come back."""
-        scores = []
-        # Use distinct (location, operation) pairs so dedup doesn't collapse them
-        locations  = [Location.MODULE_LEVEL, Location.CLASS_METHOD, Location.NESTED_FUNCTION]
-        operations = [Operation.EXTERNAL_CALL, Operation.MUTATION, Operation.ERROR_HANDLING]
-        detectors  = ["has_timeout_parameter", "mutates_parameter", "has_broad_exception"]
-
-        i = 0
-        for loc in locations:
-            for op, det in zip(operations, detectors):
-                ctx = PatternContext(loc, op, Stability.STABLE)
-                # Descending surprise so ranking is deterministic
-                surprise = 0.95 - (i * 0.01)
-                scores.append(_score(surprise, detector=det, context=ctx))
-                i += 1
-                if i >= MAX_WARNINGS + 3:
-                    break
-            if i >= MAX_WARNINGS + 3:
-                break
-
-        warnings = gate_warnings(scores)
+        warnings = gate_warnings(list(_CAP_SCORES))
         assert len(warnings) == MAX_WARNINGS
 
     def test_exactly_max_is_not_truncated(self):
         """Exactly MAX_WARNINGS valid scores → all returned."""
-        scores = []
-        locations  = [Location.MODULE_LEVEL, Location.CLASS_METHOD, Location.NESTED_FUNCTION]
-        operations = [Operation.EXTERNAL_CALL, Operation.MUTATION, Operation.ERROR_HANDLING]
-        detectors  = ["has_timeout_parameter", "mutates_parameter", "has_broad_exception"]
-
-        i = 0
-        for loc in locations:
-            for op, det in zip(operations, detectors):
-                if i >= MAX_WARNINGS:
-                    break
-                ctx = PatternContext(loc, op, Stability.STABLE)
-                scores.append(_score(0.9 - (i * 0.01), detector=det, context=ctx))
-                i += 1
-            if i >= MAX_WARNINGS:
-                break
-
-        warnings = gate_warnings(scores)
+        warnings = gate_warnings(list(_CAP_SCORES[:MAX_WARNINGS]))
         assert len(warnings) == MAX_WARNINGS
 
     def test_fewer_than_max_returns_all(self):
@@ -309,13 +309,20 @@ class TestIntegration:
         ctx_stable   = _ctx(op=Operation.MUTATION, stab=Stability.STABLE)
 
         scores = [
-            _score(0.95, detector="has_timeout_parameter", context=ctx_new),       # suppressed: NEW
-            _score(0.7,  detector="has_timeout_parameter", context=ctx_volatile),  # suppressed: VOLATILE < 0.8
-            _score(0.85, detector="has_timeout_parameter", context=ctx_volatile),  # passes: VOLATILE >= 0.8
-            _score(0.7,  detector="has_broad_exception",   context=ctx_err),       # collapse: lower surprise
-            _score(0.9,  detector="swallows_exception",    context=ctx_err),       # collapse: wins
-            _score(0.3,  detector="mutates_parameter",     context=ctx_stable),    # dropped: below threshold
-            _score(0.88, detector="mutates_parameter",     context=ctx_stable),    # passes
+            # suppressed: NEW
+            _score(0.95, detector="has_timeout_parameter", context=ctx_new),
+            # suppressed: VOLATILE < 0.8
+            _score(0.7,  detector="has_timeout_parameter", context=ctx_volatile),
+            # passes: VOLATILE >= 0.8
+            _score(0.85, detector="has_timeout_parameter", context=ctx_volatile),
+            # collapse: lower surprise
+            _score(0.7,  detector="has_broad_exception",   context=ctx_err),
+            # collapse: wins
+            _score(0.9,  detector="swallows_exception",    context=ctx_err),
+            # dropped: below threshold
+            _score(0.3,  detector="mutates_parameter",     context=ctx_stable),
+            # passes
+            _score(0.88, detector="mutates_parameter",     context=ctx_stable),
         ]
 
         warnings = gate_warnings(scores)
@@ -353,38 +360,5 @@ class TestIntegration:
 # Runner
 # ---------------------------------------------------------------------------
 
-def run_all_tests():
-    print("Running warning gating tests...\n")
-
-    suites = [
-        ("Threshold",    TestSurpriseThreshold),
-        ("Stability",    TestStabilitySuppression),
-        ("Dedup",        TestDeduplication),
-        ("Ranking",      TestRanking),
-        ("Cap",          TestWarningsCap),
-        ("Integration",  TestIntegration),
-    ]
-
-    passed = 0
-    failed = 0
-
-    for suite_name, cls in suites:
-        instance = cls()
-        methods = [m for m in dir(instance) if m.startswith("test_")]
-        for method_name in sorted(methods):
-            label = f"{suite_name}.{method_name}"
-            try:
-                getattr(instance, method_name)()
-                print(f"  ✓ {label}")
-                passed += 1
-            except Exception as e:
-                print(f"  ✗ {label}")
-                print(f"      {e}")
-                failed += 1
-
-    print(f"\n{'✅' if failed == 0 else '❌'} {passed} passed, {failed} failed")
-    return failed == 0
-
-
 if __name__ == "__main__":
-    sys.exit(0 if run_all_tests() else 1)
+    sys.exit(main(__file__))